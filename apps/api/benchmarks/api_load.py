@@ -0,0 +1,155 @@
+"""
+API load test against a stubbed Supabase backend.
+
+Replaces `supabase_client.supabase` with an in-memory fake whose queries sleep for a configurable
+per-table latency, then drives the FastAPI app in-process (httpx ASGI transport, no network, no
+Supabase) with concurrent clients. A few clients hammer /api/youtube/analytics against a slow
+table while the rest hit the fast list endpoints; the run is repeated with the blocking calls on
+the event loop (DB_OFFLOAD_ENABLED off, the old behaviour) and offloaded, and p50/p99 latency per
+endpoint is reported for both.
+
+    cd apps/api
+    python -m benchmarks.api_load --requests 200 --concurrency 32 --slow-ms 300
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import types
+from datetime import datetime, timezone
+
+ROWS = {
+    "videos": [{"id": str(i), "status": "ready", "created_at": "2026-01-01T00:00:00+00:00"} for i in range(20)],
+    "scrape_jobs": [{"id": str(i), "status": "completed", "created_at": "2026-01-01T00:00:00+00:00"} for i in range(10)],
+    "youtube_channels": [{"id": "ch1", "channel_name": "Bench", "updated_at": "2026-01-01T00:00:00+00:00"}],
+    "youtube_analytics_latest": []
+}
+
+def snapshot_row() -> dict:
+    # Fresh, so /api/youtube/analytics never queues a refresh (there is no broker in the benchmark)
+    return {
+        "channel_id": "ch1", "channel_name": "Bench", "subscriber_count": 1, "view_count": 1, "video_count": 1,
+        "thumbnail": None, "recent_videos": [], "captured_at": datetime.now(timezone.utc).isoformat()
+    }
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data) if isinstance(data, list) else None
+
+class FakeQuery:
+    """Accepts any PostgREST builder chain; execute() sleeps like a network round trip."""
+
+    def __init__(self, backend, table: str):
+        self.backend = backend
+        self.table = table
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.backend.latency(self.table))
+        return FakeResult(ROWS.get(self.table, {}))
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float, slow_tables: dict):
+        self.latency_ms = latency_ms
+        self.slow_tables = slow_tables
+
+    def latency(self, table: str) -> float:
+        return self.slow_tables.get(table, self.latency_ms) / 1000
+
+    def table(self, name: str):
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params=None):
+        return FakeQuery(self, f"rpc:{name}")
+
+def install_fake_backend(latency_ms: float, slow_ms: float):
+    # Must run before anything imports supabase_client
+    ROWS["youtube_analytics_latest"] = [snapshot_row()]
+    module = types.ModuleType("supabase_client")
+    module.supabase = FakeSupabase(latency_ms, {"youtube_analytics_latest": slow_ms})
+    sys.modules["supabase_client"] = module
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run_load(app, requests: int, concurrency: int, slow_clients: int):
+    import httpx
+
+    latencies = {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait("/api/videos/" if i % 2 else "/api/jobs/")
+
+    async def client_loop(client, path=None):
+        while True:
+            if path is None:
+                try:
+                    target = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+            elif queue.empty():
+                return
+            else:
+                target = path
+            start = time.perf_counter()
+            res = await client.get(target)
+            res.raise_for_status()
+            latencies.setdefault(target, []).append((time.perf_counter() - start) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client_loop(client) for _ in range(concurrency)),
+            *(client_loop(client, "/api/youtube/analytics") for _ in range(slow_clients))
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": {
+            path: {
+                "requests": len(values),
+                "p50_ms": round(statistics.median(values), 1),
+                "p99_ms": round(percentile(values, 99), 1)
+            }
+            for path, values in sorted(latencies.items())
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests to the fast list endpoints")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--slow-clients", type=int, default=4, help="Clients looping on /api/youtube/analytics")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency of every stubbed query")
+    parser.add_argument("--slow-ms", type=float, default=300, help="Latency of the analytics snapshot query")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    install_fake_backend(args.latency_ms, args.slow_ms)
+    from config import settings
+    from main import app
+
+    results = {}
+    for mode, offload in (("blocking", False), ("offloaded", True)):
+        settings.DB_OFFLOAD_ENABLED = offload
+        results[mode] = asyncio.run(run_load(app, args.requests, args.concurrency, args.slow_clients))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<10} {'endpoint':<24} {'requests':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, result in results.items():
+        for path, row in result["endpoints"].items():
+            print(f"{mode:<10} {path:<24} {row['requests']:>8} {row['p50_ms']:>9} {row['p99_ms']:>9}")
+        print(f"{mode:<10} {'total wall time':<24} {result['elapsed_s']:>8}s")
+
+if __name__ == "__main__":
+    main()
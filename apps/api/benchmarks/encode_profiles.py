@@ -0,0 +1,82 @@
+"""
+Encode profile benchmark.
+
+Generates synthetic clips with ffmpeg's lavfi sources (no network, no Supabase) and runs each one
+through VideoProcessor.inject_hook with every encode profile, reporting wall time, CPU seconds
+spent in ffmpeg and output size.
+
+    cd apps/api
+    python -m benchmarks.encode_profiles --durations 30 60 --profiles fast balanced shorts_1080p
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import ffmpeg
+from services.encode_profiles import ENCODE_PROFILES
+from services.video import VideoProcessor
+
+CLIP_SIZES = {
+    "720x1280": (720, 1280),
+    "1080x1920": (1080, 1920)
+}
+
+def make_clip(path: str, width: int, height: int, duration: int, fps: int = 30):
+    # testsrc2 has enough motion and detail to keep x264 honest, sine gives a real audio track
+    video = ffmpeg.input(f"testsrc2=size={width}x{height}:rate={fps}", f="lavfi", t=duration)
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=44100", f="lavfi", t=duration)
+    ffmpeg.output(
+        video, audio, path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p", acodec="aac", ac=2
+    ).run(overwrite_output=True, quiet=True)
+
+def children_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def run(profiles, sizes, durations, smart_render: bool):
+    processor = VideoProcessor()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="encode_bench_") as work_dir:
+        for size in sizes:
+            width, height = CLIP_SIZES[size]
+            for duration in durations:
+                clip = os.path.join(work_dir, f"clip_{size}_{duration}s.mp4")
+                make_clip(clip, width, height, duration)
+                for name in profiles:
+                    out = os.path.join(work_dir, f"out_{name}_{size}_{duration}s.mp4")
+                    cpu_before = children_cpu_seconds()
+                    start = time.perf_counter()
+                    processor.inject_hook(clip, out, "Benchmark hook", smart_render=smart_render, encode_profile=name)
+                    results.append({
+                        "profile": name,
+                        "clip": size,
+                        "duration_s": duration,
+                        "wall_s": round(time.perf_counter() - start, 2),
+                        "cpu_s": round(children_cpu_seconds() - cpu_before, 2),
+                        "size_mb": round(os.path.getsize(out) / 1024 ** 2, 2)
+                    })
+                    print(
+                        f"{name:<14} {size:<10} {duration:>4}s  wall {results[-1]['wall_s']:>7.2f}s  "
+                        f"cpu {results[-1]['cpu_s']:>7.2f}s  size {results[-1]['size_mb']:>7.2f} MB",
+                        flush=True
+                    )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encode profiles on synthetic clips")
+    parser.add_argument("--profiles", nargs="+", default=list(ENCODE_PROFILES), choices=list(ENCODE_PROFILES))
+    parser.add_argument("--sizes", nargs="+", default=list(CLIP_SIZES), choices=list(CLIP_SIZES))
+    parser.add_argument("--durations", nargs="+", type=int, default=[30, 60])
+    parser.add_argument("--smart-render", action="store_true", help="Allow the smart-render fast path (default: full encode only)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.profiles, args.sizes, args.durations, args.smart_render)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
+import time
 from celery import Celery
+from celery.signals import task_prerun, task_postrun, worker_init, worker_process_shutdown
 from config import settings
+from services import metrics
 
 # Determine Broker conditionally (fallback to SQLite for Windows Local Dev if Redis isn't running)
 broker_url = settings.REDIS_URL
@@ -19,7 +22,18 @@ celery_app.conf.update(
     timezone="America/Los_Angeles",
     enable_utc=False,
     worker_prefetch_multiplier=1,
-    include=["tasks.pipeline", "tasks.youtube"]
+    broker_transport_options={"visibility_timeout": settings.BROKER_VISIBILITY_TIMEOUT_SECONDS},
+    include=["tasks.pipeline", "tasks.youtube"],
+    # Staged processing: CPU-heavy ffmpeg work gets its own queue (and worker) so network-bound
+    # downloads, LLM calls and uploads of other videos keep flowing while it runs
+    task_routes={
+        "tasks.pipeline.download_stage": {"queue": "download"},
+        "tasks.pipeline.transcode_stage": {"queue": "transcode"},
+        "tasks.pipeline.metadata_stage": {"queue": "metadata"},
+        "tasks.pipeline.finalize_stage": {"queue": "publish"},
+        "tasks.youtube.publish_video": {"queue": "publish"},
+        "tasks.youtube.schedule_publishes": {"queue": "publish"},
+    }
 )
 
 from celery.schedules import crontab
@@ -29,8 +43,38 @@ celery_app.conf.beat_schedule = {
         "task": "tasks.youtube.retry_paused_videos",
         "schedule": crontab(hour=0, minute=5), # 00:05 PST
     },
+    "schedule-publishes": {
+        "task": "tasks.youtube.schedule_publishes",
+        "schedule": crontab(minute="*/15"),
+    },
+    "collect-youtube-analytics": {
+        "task": "tasks.youtube.collect_youtube_analytics",
+        "schedule": crontab(minute="*/30"),
+    },
     "daily-smart-scraper": {
         "task": "tasks.pipeline.daily_smart_scraper",
         "schedule": crontab(hour=6, minute=0), # Run daily at 6:00 AM PST 
     }
 }
+
+# Metrics: each worker's main process serves /metrics for itself and its prefork children
+_task_started = {}
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    metrics.start_worker_exporter(settings.METRICS_WORKER_PORT)
+
+@worker_process_shutdown.connect
+def forget_worker_process(pid=None, **kwargs):
+    if pid:
+        metrics.mark_process_dead(pid)
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def record_task_end(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None and task is not None:
+        metrics.TASK_SECONDS.labels(task=task.name.rsplit(".", 1)[-1], state=state or "UNKNOWN").observe(time.perf_counter() - started)
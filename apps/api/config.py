@@ -9,12 +9,70 @@ class Settings(BaseSettings):
     # Redis (or SQLAlchemy fallback)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     SQLALCHEMY_DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # Redis redelivers unacked messages after this long, so it must exceed the furthest eta we schedule
+    # (publish slots up to 2 days ahead, quota deferrals up to the next reset)
+    BROKER_VISIBILITY_TIMEOUT_SECONDS: int = int(os.getenv("BROKER_VISIBILITY_TIMEOUT_SECONDS", str(3 * 24 * 3600)))
 
     # AI
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     GROQ_MODEL_LARGE: str = "llama-3.3-70b-versatile"
     GROQ_MODEL_SMALL: str = "llama-3.1-8b-instant"
     GROQ_VISION_MODEL: str = "llama-3.2-90b-vision-preview"
+    GROQ_BATCH_TOKEN_BUDGET: int = int(os.getenv("GROQ_BATCH_TOKEN_BUDGET", "6000"))
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+
+    # LLM response cache ("sqlite", "redis" or "none")
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+    # Instagram scraping
+    SCRAPE_CONCURRENCY: int = int(os.getenv("SCRAPE_CONCURRENCY", "3"))
+    INSTAGRAM_REQUESTS_PER_MINUTE: int = int(os.getenv("INSTAGRAM_REQUESTS_PER_MINUTE", "30"))
+    INSTAGRAM_REQUEST_BURST: int = int(os.getenv("INSTAGRAM_REQUEST_BURST", "5"))
+
+    # Hook intro cache
+    HOOK_CACHE_DIR: str = os.getenv("HOOK_CACHE_DIR", os.path.join(os.getcwd(), "temp", "hooks"))
+    HOOK_CACHE_MAX_BYTES: int = int(os.getenv("HOOK_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Hook uploads and the hook catalog
+    HOOK_MAX_UPLOAD_MB: int = int(os.getenv("HOOK_MAX_UPLOAD_MB", "200"))
+    HOOK_MAX_DURATION_SECONDS: float = float(os.getenv("HOOK_MAX_DURATION_SECONDS", "30"))
+    HOOK_CATALOG_TTL_SECONDS: float = float(os.getenv("HOOK_CATALOG_TTL_SECONDS", "60"))
+
+    # Scratch workspace for downloads and encodes (per worker box)
+    WORKSPACE_DIR: str = os.getenv("WORKSPACE_DIR", os.path.join(os.getcwd(), "temp", "workspace"))
+    WORKSPACE_MAX_BYTES: int = int(os.getenv("WORKSPACE_MAX_BYTES", str(10 * 1024 ** 3)))
+    WORKSPACE_MIN_FREE_MB: int = int(os.getenv("WORKSPACE_MIN_FREE_MB", "2048"))
+
+    # Reel downloads, cached by Instagram shortcode
+    DOWNLOAD_CACHE_DIR: str = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(os.getcwd(), "temp", "downloads"))
+    DOWNLOAD_CACHE_MAX_BYTES: int = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+    DOWNLOAD_CONCURRENT_FRAGMENTS: int = int(os.getenv("DOWNLOAD_CONCURRENT_FRAGMENTS", "4"))
+
+    # Video processing
+    # Downloaded clips longer than this are rejected before any encoding (YouTube Shorts limit)
+    MAX_CLIP_SECONDS: int = int(os.getenv("MAX_CLIP_SECONDS", "180"))
+    SMART_RENDER_ENABLED: bool = os.getenv("SMART_RENDER_ENABLED", "true").lower() == "true"
+
+    # Threads the async routers use for blocking Supabase / Google calls (see db.py)
+    DB_THREADPOOL_SIZE: int = int(os.getenv("DB_THREADPOOL_SIZE", "16"))
+    DB_OFFLOAD_ENABLED: bool = os.getenv("DB_OFFLOAD_ENABLED", "true").lower() == "true"
+
+    # Where user settings live: "file" (data/user_settings.json) or "database" (app_settings table)
+    SETTINGS_BACKEND: str = os.getenv("SETTINGS_BACKEND", "file")
+    # With the database backend, how long a process reuses its settings before re-checking the version
+    SETTINGS_VERSION_TTL_SECONDS: float = float(os.getenv("SETTINGS_VERSION_TTL_SECONDS", "5"))
+
+    # Dashboard
+    # Live status events for the dashboard: "redis" (pub/sub across processes) or "local" (in-process only)
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "redis")
+    STATS_CACHE_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_TTL_SECONDS", "5"))
+
+    # YouTube analytics snapshots are served stale and refreshed in the background after this age
+    ANALYTICS_STALE_SECONDS: int = int(os.getenv("ANALYTICS_STALE_SECONDS", "900"))
+    # Snapshots older than this are pruned after each collection (the newest per channel is always kept)
+    ANALYTICS_RETENTION_DAYS: int = int(os.getenv("ANALYTICS_RETENTION_DAYS", "30"))
 
     # Web Search
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
@@ -22,6 +80,14 @@ class Settings(BaseSettings):
     # YouTube
     YOUTUBE_CLIENT_ID: str = os.getenv("YOUTUBE_CLIENT_ID", "")
     YOUTUBE_CLIENT_SECRET: str = os.getenv("YOUTUBE_CLIENT_SECRET", "")
+    YOUTUBE_UPLOAD_URL: str = os.getenv("YOUTUBE_UPLOAD_URL", "https://www.googleapis.com/upload/youtube/v3/videos")
+    YOUTUBE_UPLOAD_CHUNK_MB: int = int(os.getenv("YOUTUBE_UPLOAD_CHUNK_MB", "8"))
+    YOUTUBE_DAILY_QUOTA: int = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+    # Timezone of the publish window in the user settings
+    PUBLISH_TIMEZONE: str = os.getenv("PUBLISH_TIMEZONE", "America/Los_Angeles")
+
+    # Port of the Prometheus exporter each Celery worker starts (the API serves /metrics itself)
+    METRICS_WORKER_PORT: int = int(os.getenv("METRICS_WORKER_PORT", "9101"))
 
     # App
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-min-32-chars")
@@ -0,0 +1,21 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from config import settings
+
+# supabase-py (httpx.Client, pooled and thread-safe) and the Google API client are synchronous.
+# The async routers hand those calls to this pool so a slow query or API call only holds a
+# worker thread, not the event loop. It is separate from Starlette's threadpool, which already
+# serves the plain `def` routes.
+_executor = ThreadPoolExecutor(max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db")
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call (Supabase, Google API, Celery .delay) off the event loop."""
+    if not settings.DB_OFFLOAD_ENABLED:
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+async def execute(query):
+    """Await a PostgREST query builder: `res = await execute(supabase.table("videos").select("*"))`."""
+    return await run_blocking(query.execute)
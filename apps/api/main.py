@@ -1,7 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
-from routers import videos, jobs, youtube, settings as settings_router
+from routers import videos, jobs, youtube, events, settings as settings_router
+from services import metrics
 
 app = FastAPI(
     title="ReelFlow API",
@@ -20,6 +21,7 @@ app.include_router(videos.router)
 app.include_router(jobs.router)
 app.include_router(youtube.router)
 app.include_router(settings_router.router)
+app.include_router(events.router)
 
 @app.get("/")
 async def root():
@@ -33,3 +35,8 @@ async def api_root():
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "version": "1.1.0"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,38 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from services.events import broadcaster
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+TABLES = {"scrape_jobs", "pipeline_jobs", "videos"}
+# Comment line to keep proxies from closing an idle stream
+HEARTBEAT_SECONDS = 15
+
+@router.get("/stream")
+async def stream_events(request: Request, tables: Optional[str] = Query(None, description="Comma-separated tables to follow")):
+    """
+    Server-Sent Events feed of status changes ({table, id, status, current_step, upload_progress, ...}).
+    Clients load the current state once from the list endpoints and then apply these events.
+    """
+    wanted = {t.strip() for t in tables.split(",")} & TABLES if tables else TABLES
+
+    async def event_stream():
+        with broadcaster.subscribe() as queue:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.get("table") in wanted:
+                    yield f"event: {event['table']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from schemas import ScrapeRequest
 from supabase_client import supabase
+from db import execute, run_blocking
+from services.pagination import keyset_page, parse_columns, parse_list
+from services.events import publish_event
 from tasks.pipeline import run_scrape_job
 import uuid
 
@@ -10,24 +14,64 @@ router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
 async def trigger_scrape(request: ScrapeRequest):
     try:
         # 1. Create job record in Supabase
-        job_res = supabase.table("scrape_jobs").insert({
+        job_res = await execute(supabase.table("scrape_jobs").insert({
             "instagram_username": request.instagram_username,
             "status": "pending"
-        }).execute()
+        }))
         
         if not job_res.data:
             raise HTTPException(status_code=500, detail="Failed to create job record")
             
         job_id = job_res.data[0]["id"]
+        await run_blocking(publish_event, "scrape_jobs", job_id, status="pending", instagram_username=request.instagram_username)
         
         # 2. Enqueue Celery task
-        run_scrape_job.delay(job_id, request.instagram_username, request.min_ai_score)
+        await run_blocking(run_scrape_job.delay, job_id, request.instagram_username, request.min_ai_score)
         
         return {"status": "success", "job_id": job_id, "username": request.instagram_username}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+JOB_COLUMNS = {"id", "instagram_username", "status", "videos_found", "error_message", "created_at"}
+PIPELINE_JOB_COLUMNS = {
+    "id", "video_id", "status", "current_step", "error_message", "upload_progress", "upload_channel_id", "created_at"
+}
+
 @router.get("/")
-async def list_jobs():
-    res = supabase.table("scrape_jobs").select("*").order("created_at", desc=True).limit(10).execute()
-    return res.data
+async def list_jobs(
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    try:
+        columns = parse_columns(fields, JOB_COLUMNS, JOB_COLUMNS)
+        query = supabase.table("scrape_jobs").select(",".join(columns))
+        statuses = parse_list(status)
+        if statuses:
+            query = query.in_("status", statuses)
+        jobs, next_cursor = await run_blocking(keyset_page, query, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": jobs, "next_cursor": next_cursor}
+
+@router.get("/pipeline")
+async def list_pipeline_jobs(
+    video_id: Optional[str] = None,
+    status: Optional[str] = Query(None, description="Comma-separated statuses"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=100)
+):
+    try:
+        columns = parse_columns(fields, PIPELINE_JOB_COLUMNS, PIPELINE_JOB_COLUMNS)
+        query = supabase.table("pipeline_jobs").select(",".join(columns))
+        if video_id:
+            query = query.eq("video_id", video_id)
+        statuses = parse_list(status)
+        if statuses:
+            query = query.in_("status", statuses)
+        jobs, next_cursor = await run_blocking(keyset_page, query, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": jobs, "next_cursor": next_cursor}
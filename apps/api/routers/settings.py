@@ -1,8 +1,15 @@
-import json
 import os
+import tempfile
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from db import run_blocking
+from services.encode_profiles import ENCODE_PROFILES, DEFAULT_PROFILE
+from services.hook_catalog import BUCKET, hook_catalog, probe_hook
+from services.settings_store import create_settings_store
+from services.youtube_clients import youtube_clients
+from supabase_client import supabase
+from config import settings as app_config
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
@@ -13,81 +20,121 @@ class UserSettings(BaseModel):
     selected_hook_url: str = ""
     publish_time_start: str = "09:00" # HH:MM format
     publish_time_end: str = "21:00"   # HH:MM format
+    encode_profile: Optional[str] = None # see services/encode_profiles.py; kept as stored when omitted
+
+DEFAULT_SETTINGS = {
+    "hook_mode": "single_video", 
+    "selected_hook_url": "",
+    "publish_time_start": "09:00",
+    "publish_time_end": "21:00",
+    "encode_profile": DEFAULT_PROFILE
+}
+
+settings_store = create_settings_store(
+    app_config.SETTINGS_BACKEND, DATA_FILE, client=supabase, ttl=app_config.SETTINGS_VERSION_TTL_SECONDS
+)
 
 def load_settings():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-            return data
-    return {
-        "hook_mode": "single_video", 
-        "selected_hook_url": "",
-        "publish_time_start": "09:00",
-        "publish_time_end": "21:00"
-    }
+    # Cached per process; re-read only after a save from any process
+    return {**DEFAULT_SETTINGS, **(settings_store.load() or {})}
 
 def save_settings(settings: dict):
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    with open(DATA_FILE, "w") as f:
-        json.dump(settings, f)
+    settings_store.save(settings)
 
 @router.get("/")
 def get_user_settings():
     return load_settings()
 
+@router.get("/encode-profiles")
+def list_encode_profiles():
+    return {"profiles": [{"name": name, **profile} for name, profile in ENCODE_PROFILES.items()], "default": DEFAULT_PROFILE}
+
 @router.post("/")
 def update_user_settings(settings: UserSettings):
-    save_settings(settings.model_dump())
-    return {"status": "success", "settings": settings.model_dump()}
-
-from fastapi import UploadFile, File
-from supabase_client import supabase
+    if settings.encode_profile is not None and settings.encode_profile not in ENCODE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown encode profile '{settings.encode_profile}'")
+    # Fields a client leaves out (the web form has no encode profile) keep their stored value
+    merged = {**load_settings(), **settings.model_dump(exclude_none=True)}
+    save_settings(merged)
+    # The publish window may have moved: re-plan every scheduled upload
+    from tasks.youtube import schedule_publishes
+    schedule_publishes.delay()
+    return {"status": "success", "settings": merged}
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def _spool_upload(file: UploadFile, max_bytes: int):
+    """Copy the upload to a temp file in fixed-size chunks, so memory stays bounded whatever its size."""
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as spool:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Hook videos are limited to {app_config.HOOK_MAX_UPLOAD_MB} MB")
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            os.remove(spool.name)
+            raise
+    return spool.name, size
+
+def _store_hook(file_path: str, spool_path: str):
+    bucket = supabase.storage.from_(BUCKET)
+    # An open file is streamed by httpx instead of being read into memory
+    with open(spool_path, "rb") as f:
+        try:
+            bucket.upload(path=file_path, file=f, file_options={"content-type": "video/mp4", "upsert": "true"})
+        except Exception as e:
+            if "Duplicate" not in str(e):
+                raise
+            # Attempt to overwrite by removing first if upsert fails on some sdk versions
+            bucket.remove([file_path])
+            f.seek(0)
+            bucket.upload(path=file_path, file=f, file_options={"content-type": "video/mp4"})
 
 @router.post("/upload-hook")
 async def upload_hook_video(file: UploadFile = File(...)):
     if not file.filename.endswith(".mp4"):
         raise HTTPException(status_code=400, detail="Only .mp4 files are supported")
     
-    file_bytes = await file.read()
     file_path = f"{file.filename.replace(' ', '_')}"
-    
-    # Upload to Supabase 'hooks' bucket
+    spool_path, size = await _spool_upload(file, app_config.HOOK_MAX_UPLOAD_MB * 1024 * 1024)
     try:
-        supabase.storage.from_("hooks").upload(
-            path=file_path, 
-            file=file_bytes, 
-            file_options={"content-type": "video/mp4", "upsert": "true"}
-        )
-    except Exception as e:
-        if "Duplicate" in str(e):
-            # Attempt to overwrite by removing first if upsert fails on some sdk versions
-            supabase.storage.from_("hooks").remove([file_path])
-            supabase.storage.from_("hooks").upload(
-                path=file_path, 
-                file=file_bytes, 
-                file_options={"content-type": "video/mp4"}
-            )
-        else:
-            raise HTTPException(status_code=500, detail=str(e))
+        try:
+            info = await run_blocking(probe_hook, spool_path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
             
-    # Get public URL
-    public_url = supabase.storage.from_("hooks").get_public_url(file_path)
+        # Upload to Supabase 'hooks' bucket
+        try:
+            await run_blocking(_store_hook, file_path, spool_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.remove(spool_path)
     
-    # Also return the list of all files in the bucket
-    filesRes = supabase.storage.from_("hooks").list()
-    files = [{"name": f["name"], "url": supabase.storage.from_("hooks").get_public_url(f["name"])} for f in filesRes if f["name"].endswith(".mp4")]
+    entry = await run_blocking(hook_catalog.add, file_path, size, info)
+    files = await run_blocking(hook_catalog.list)
     
-    return {"status": "success", "url": public_url, "files": files}
+    return {"status": "success", "url": entry["url"], "hook": entry, "files": files}
 
 @router.get("/hooks")
 def list_hooks():
     try:
-        filesRes = supabase.storage.from_("hooks").list()
-        files = [{"name": f["name"], "url": supabase.storage.from_("hooks").get_public_url(f["name"])} for f in filesRes if f["name"].endswith(".mp4")]
-        return {"hooks": files}
+        return {"hooks": hook_catalog.list()}
     except Exception as e:
         return {"hooks": [], "error": str(e)}
 
+@router.delete("/hooks/{name}")
+def delete_hook(name: str):
+    try:
+        supabase.storage.from_(BUCKET).remove([name])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    hook_catalog.remove(name)
+    return {"status": "success", "hooks": hook_catalog.list()}
+
 # --- Multi-Account Endpoints ---
 
 class IGAccount(BaseModel):
@@ -121,4 +168,5 @@ def list_yt_channels():
 @router.delete("/youtube/channels/{id}")
 def delete_yt_channel(id: str):
     supabase.table("youtube_channels").delete().eq("id", id).execute()
+    youtube_clients.invalidate(id)
     return {"status": "success"}
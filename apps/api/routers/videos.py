@@ -1,39 +1,42 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from supabase_client import supabase
+from db import run_blocking
+from services.pagination import keyset_page, parse_columns, parse_list
+from services.stats import dashboard_stats
 
 router = APIRouter(prefix="/api/videos", tags=["Videos"])
 
+VIDEO_COLUMNS = {
+    "id", "instagram_video_id", "instagram_url", "instagram_caption", "instagram_views", "ai_score", "status",
+    "hook_text", "hook_style", "yt_title", "yt_description", "yt_hashtags", "youtube_video_url", "error_message",
+    "scheduled_publish_at", "created_at"
+}
+# Long free text (captions, descriptions) only when asked for with `fields`
+DEFAULT_VIDEO_COLUMNS = [
+    "instagram_url", "instagram_views", "ai_score", "status", "hook_text", "yt_title", "youtube_video_url",
+    "error_message", "scheduled_publish_at"
+]
+
 @router.get("/stats")
 async def get_stats():
-    # A single user internal tool so we can just grab overall counts
-    # using simple queries
-    
-    # In python supabase we can just fetch all or construct count queries
-    # To keep it simple we query the counts using exact=True
-    res_total = supabase.table("videos").select("id", count="exact").execute()
-    total = res_total.count if res_total.count is not None else 0
-    
-    res_pipeline = supabase.table("videos").select("id", count="exact").in_("status", ["processing", "ready", "retrying"]).execute()
-    pipeline = res_pipeline.count if res_pipeline.count is not None else 0
-    
-    res_published = supabase.table("videos").select("id", count="exact").eq("status", "published").execute()
-    published = res_published.count if res_published.count is not None else 0
-    
-    res_yt = supabase.table("youtube_channels").select("id", count="exact").execute()
-    yt_count = res_yt.count if res_yt.count is not None else 0
-    
-    res_ig = supabase.table("instagram_accounts").select("id", count="exact").execute()
-    ig_count = res_ig.count if res_ig.count is not None else 0
-    
-    return {
-        "total": total,
-        "pipeline": pipeline,
-        "published": published,
-        "youtube_channels": yt_count,
-        "instagram_accounts": ig_count
-    }
+    # One aggregate RPC over trigger-maintained counters, cached for a few seconds
+    return await run_blocking(dashboard_stats.get)
 
 @router.get("/")
-async def list_videos():
-    res = supabase.table("videos").select("*").order("created_at", desc=True).limit(20).execute()
-    return {"videos": res.data}
+async def list_videos(
+    status: Optional[str] = Query(None, description="Comma-separated statuses, e.g. ready,scheduled"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    try:
+        columns = parse_columns(fields, VIDEO_COLUMNS, DEFAULT_VIDEO_COLUMNS)
+        query = supabase.table("videos").select(",".join(columns))
+        statuses = parse_list(status)
+        if statuses:
+            query = query.in_("status", statuses)
+        videos, next_cursor = await run_blocking(keyset_page, query, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"videos": videos, "next_cursor": next_cursor}
@@ -1,12 +1,23 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from services.youtube import YouTubeService
+from services.youtube_clients import build_client, youtube_clients
 from supabase_client import supabase
+from db import execute, run_blocking
 from config import settings
+from tasks.youtube import collect_youtube_analytics
+from datetime import datetime, timedelta, timezone
+import logging
+import time
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/youtube", tags=["YouTube"])
 yt_service = YouTubeService()
 
+# Don't queue another analytics refresh while one is most likely still running
+REFRESH_DEBOUNCE_SECONDS = 60
+_last_refresh_requested = -REFRESH_DEBOUNCE_SECONDS
+
 class AuthCallback(BaseModel):
     code: str
     redirect_uri: str = "http://localhost:3000/api/auth/youtube/callback"
@@ -18,22 +29,21 @@ async def get_auth_url(redirect_uri: str = "http://localhost:3000/api/auth/youtu
 
 @router.post("/callback")
 async def handle_callback(data: AuthCallback):
-    print(f"DEBUG: YouTube callback received with code: {data.code[:10]}... for URI: {data.redirect_uri}")
+    logger.debug(f"YouTube callback received for URI: {data.redirect_uri}")
     try:
         # Check limit of 5
-        count_res = supabase.table("youtube_channels").select("id", count="exact").execute()
+        count_res = await execute(supabase.table("youtube_channels").select("id", count="exact"))
         if count_res.count >= 5:
             raise HTTPException(status_code=400, detail="Maximum of 5 YouTube channels allowed")
 
-        creds = yt_service.exchange_code(data.code, data.redirect_uri)
+        creds = await run_blocking(yt_service.exchange_code, data.code, data.redirect_uri)
         
         # Fetch channel metadata
-        from googleapiclient.discovery import build
         import google.oauth2.credentials
         
         creds_obj = google.oauth2.credentials.Credentials(creds["token"], refresh_token=creds["refresh_token"])
-        yt = build('youtube', 'v3', credentials=creds_obj)
-        ch_res = yt.channels().list(part="snippet", mine=True).execute()
+        yt = await run_blocking(build_client, creds_obj)
+        ch_res = await execute(yt.channels().list(part="snippet", mine=True))
         
         if not ch_res.get("items"):
             raise Exception("Could not find YouTube channel")
@@ -42,12 +52,17 @@ async def handle_callback(data: AuthCallback):
         channel_id = channel["id"]
         channel_name = channel["snippet"]["title"]
         
-        supabase.table("youtube_channels").upsert({
+        res = await execute(supabase.table("youtube_channels").upsert({
             "youtube_channel_id": channel_id,
             "channel_name": channel_name,
             "access_token": creds["token"],
             "refresh_token": creds["refresh_token"],
-        }, on_conflict="youtube_channel_id").execute()
+            "token_expires_at": creds["expiry"].replace(tzinfo=timezone.utc).isoformat() if creds["expiry"] else None,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, on_conflict="youtube_channel_id"))
+        if res.data:
+            # Re-connected channel: drop credentials cached for its old token
+            youtube_clients.invalidate(res.data[0]["id"])
         
         return {"status": "success", "channel_name": channel_name}
     except Exception as e:
@@ -57,35 +72,56 @@ async def handle_callback(data: AuthCallback):
 
 @router.get("/status")
 async def get_status():
-    res = supabase.table("youtube_channels").select("channel_name", "updated_at").execute()
+    res = await execute(supabase.table("youtube_channels").select("channel_name", "updated_at"))
     if res.data:
         return {"connected": True, "channel": res.data[0]}
     return {"connected": False}
 
 @router.get("/analytics")
 async def get_analytics():
+    """
+    Serve the latest stored snapshot per channel (stale-while-revalidate): if any channel's snapshot
+    is missing or older than ANALYTICS_STALE_SECONDS, a background refresh is queued and the
+    current data is returned immediately.
+    """
+    global _last_refresh_requested
     try:
-        res = supabase.table("youtube_channels").select("*").execute()
-        if not res.data:
+        channels = (await execute(supabase.table("youtube_channels").select("id"))).data
+        if not channels:
             return {"channels": []}
             
+        snapshot_rows = (await execute(supabase.table("youtube_analytics_latest").select("*"))).data
+        snapshots = {row["channel_id"]: row for row in snapshot_rows}
+        
+        now = datetime.now(timezone.utc)
+        stale = any(
+            channel["id"] not in snapshots
+            or now - datetime.fromisoformat(snapshots[channel["id"]]["captured_at"]) > timedelta(seconds=settings.ANALYTICS_STALE_SECONDS)
+            for channel in channels
+        )
+        refreshing = False
+        if stale and time.monotonic() - _last_refresh_requested > REFRESH_DEBOUNCE_SECONDS:
+            _last_refresh_requested = time.monotonic()
+            await run_blocking(collect_youtube_analytics.delay)
+            refreshing = True
+            
         all_analytics = []
-        for channel in res.data:
-            creds = {
-                "token": channel["access_token"],
-                "refresh_token": channel["refresh_token"],
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "client_id": settings.YOUTUBE_CLIENT_ID,
-                "client_secret": settings.YOUTUBE_CLIENT_SECRET
-            }
-            stats = yt_service.get_channel_stats(creds)
-            if stats:
-                stats["id"] = channel["id"]
-                recent_vids = yt_service.get_recent_videos_stats(creds, limit=5)
-                stats["recent_videos"] = recent_vids
-                all_analytics.append(stats)
+        for channel in channels:
+            snapshot = snapshots.get(channel["id"])
+            if not snapshot:
+                continue
+            all_analytics.append({
+                "id": channel["id"],
+                "channel_name": snapshot["channel_name"],
+                "subscriber_count": str(snapshot["subscriber_count"]),
+                "view_count": str(snapshot["view_count"]),
+                "video_count": str(snapshot["video_count"]),
+                "thumbnail": snapshot["thumbnail"],
+                "recent_videos": snapshot["recent_videos"] or [],
+                "captured_at": snapshot["captured_at"]
+            })
                 
-        return {"channels": all_analytics}
+        return {"channels": all_analytics, "stale": stale, "refreshing": refreshing}
     except Exception as e:
         import traceback
         traceback.print_exc()
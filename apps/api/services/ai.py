@@ -1,75 +1,268 @@
-from groq import Groq
+from groq import AsyncGroq
 from config import settings
 from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Callable, Dict, List, Optional, Tuple
+from services.llm_cache import llm_cache
+from services.metrics import llm_call, record_llm_retry
+import asyncio
+import httpx
+import json
 import logging
+import threading
+import weakref
 
 logger = logging.getLogger(__name__)
 
-client = Groq(api_key=settings.GROQ_API_KEY)
+# Every attempt is timed by @llm_call, every retry counted per method
+llm_retry = retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), before_sleep=record_llm_retry)
 
-class AIService:
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def score_video(self, caption: str) -> int:
+SCORE_SYSTEM_PROMPT = "You are a viral video analyzer. Rate the following video caption for viral potential from 0 to 100. Return only the integer score and nothing else."
+SCORE_TEMPERATURE = 0.1
+
+HOOK_SYSTEM_PROMPT = "You are a YouTube Shorts expert. Write a punchy 3-7 word text hook to overlay on the first 2 seconds of this video, based on its caption. Return ONLY the text of the hook, no quotes, no conversational filler."
+
+METADATA_SYSTEM_PROMPT = (
+    "You are an elite YouTube Shorts Growth Hacker running a highly successful faceless channel. "
+    "Your sheer focus is maximizing view velocity, algorithmic reach, and audience retention. "
+    "Given the original Instagram caption of a video, you must repackage it for YouTube Shorts virality:\n\n"
+    "1. TITLE: Write a punchy, curiosity-inducing title under 55 characters. It must create an 'information gap' that forces the viewer to watch. No clickbait, but highly engaging.\n"
+    "2. DESCRIPTION: Write a natural, 1-2 sentence compelling description using conversational 'YouTuber' tone. "
+    "CRITICAL: You MUST include exactly 5 visible #hashtags at the very bottom of this description text, separated by spaces!\n"
+    "3. TAGS: Generate an array of exactly 5 backend keyword tags. The first 2 must be standard viral tags ('shorts', 'viral', 'fyp'). The last 3 must be hyper-specific, high-volume search niche tags targeting the video's core subject.\n\n"
+    "You MUST format the response strictly as valid JSON with the exact keys: 'title' (string), 'description' (string) [ensure the 5 #tags are in this string!], and 'tags' (array of strings)."
+)
+
+BATCH_SCORE_SYSTEM_PROMPT = (
+    "You are a viral video analyzer. You will receive a JSON array of video captions, each with an integer 'id'. "
+    "Rate every caption for viral potential from 0 to 100. "
+    "You MUST respond strictly as valid JSON with the exact key 'scores' (array of objects with the keys 'id' (integer) and 'score' (integer)), "
+    "containing exactly one entry per caption id."
+)
+
+def _estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 chars per token for English), good enough for chunking
+    return len(text) // 4 + 1
+
+def _parse_score(content: str) -> int:
+    # Extract just the digits if there is extra text
+    score = int(''.join(filter(str.isdigit, content.strip())))
+    return min(max(score, 0), 100)
+
+def _score_key(caption: str) -> str:
+    return llm_cache.make_key(settings.GROQ_MODEL_SMALL, SCORE_SYSTEM_PROMPT, caption, SCORE_TEMPERATURE)
+
+def _cached_scores(captions: List[str]) -> Dict[int, int]:
+    scores: Dict[int, int] = {}
+    for index, caption in enumerate(captions):
+        cached = llm_cache.get(_score_key(caption))
+        if cached is None:
+            continue
         try:
-            response = client.chat.completions.create(
-                model=settings.GROQ_MODEL_SMALL,
-                messages=[
-                    {"role": "system", "content": "You are a viral video analyzer. Rate the following video caption for viral potential from 0 to 100. Return only the integer score and nothing else."},
-                    {"role": "user", "content": caption}
-                ],
-                temperature=0.1
+            scores[index] = _parse_score(cached)
+        except ValueError:
+            pass
+    return scores
+
+def _chunk_captions(captions: List[str], indices: List[int]) -> List[List[int]]:
+    budget = settings.GROQ_BATCH_TOKEN_BUDGET
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index in indices:
+        tokens = _estimate_tokens(captions[index]) + 10 # per-entry JSON overhead
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _batch_payload(captions: List[str]) -> str:
+    return json.dumps([{"id": i, "caption": c} for i, c in enumerate(captions)], ensure_ascii=False)
+
+def _parse_batch_scores(content: str, count: int) -> Dict[int, int]:
+    data = json.loads(content)
+
+    # Keep only well-formed entries, anything else gets the per-item fallback
+    scores: Dict[int, int] = {}
+    for entry in data.get("scores", []):
+        try:
+            index = int(entry["id"])
+            score = int(entry["score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < count:
+            scores[index] = min(max(score, 0), 100)
+    return scores
+
+def _merge_batch_scores(chunk: List[int], batch_scores: Dict[int, int], scores: Dict[int, int]):
+    # Batch answers are cached under their own prompt only: a score given next to other captions
+    # is not the answer to the single-caption prompt, so it never stands in for score_video()
+    for pos, index in enumerate(chunk):
+        if pos in batch_scores:
+            scores[index] = batch_scores[pos]
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    # One long-lived loop per process for sync callers (Celery), so the pooled
+    # connections of the async client survive between tasks
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="ai-async-loop", daemon=True).start()
+        return _background_loop
+
+class AsyncAIService:
+    """
+    LLM calls built on AsyncGroq with a pooled httpx client.
+    Await it directly from FastAPI routers; from Celery tasks (or any sync code) use run_sync().
+    All calls share a semaphore, so analyze() fans out hook, metadata and scoring requests
+    concurrently without exceeding GROQ_MAX_CONCURRENCY in flight.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.GROQ_MAX_CONCURRENCY
+        # httpx pools and semaphores are bound to the loop that created them
+        self._per_loop = weakref.WeakKeyDictionary()
+
+    def _client(self) -> Tuple[AsyncGroq, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._per_loop:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+            self._per_loop[loop] = (
+                AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=http_client),
+                asyncio.Semaphore(self.max_concurrency)
             )
-            score_str = response.choices[0].message.content.strip()
-            # Extract just the digits if there is extra text
-            score = int(''.join(filter(str.isdigit, score_str)))
-            return min(max(score, 0), 100)
+        return self._per_loop[loop]
+
+    def run_sync(self, coro):
+        """Run a coroutine of this service from synchronous code and return its result."""
+        return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+    async def _create(self, **kwargs):
+        async_client, semaphore = self._client()
+        async with semaphore:
+            response = await async_client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+    async def _complete(self, model: str, system_prompt: str, user_prompt: str, temperature: float,
+                        parse: Callable[[str], object], **kwargs):
+        """
+        Run a chat completion through the response cache.
+        Only responses that parse cleanly are cached, so a retry never replays a bad answer.
+        """
+        key = llm_cache.make_key(model, system_prompt, user_prompt, temperature)
+        cached = await asyncio.to_thread(llm_cache.get, key)
+        if cached is not None:
+            try:
+                return parse(cached)
+            except Exception:
+                logger.warning("Discarding unparseable cached LLM response")
+
+        content = await self._create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            **kwargs
+        )
+        result = parse(content)
+        await asyncio.to_thread(llm_cache.set, key, content)
+        return result
+
+    @llm_retry
+    @llm_call
+    async def score_video(self, caption: str) -> int:
+        try:
+            return await self._complete(settings.GROQ_MODEL_SMALL, SCORE_SYSTEM_PROMPT, caption, SCORE_TEMPERATURE, _parse_score)
         except Exception as e:
             logger.error(f"Failed to score video: {e}")
             raise e
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def generate_hook(self, caption: str) -> str:
+    async def score_videos(self, captions: List[str]) -> List[int]:
+        """
+        Score many captions with as few LLM calls as possible.
+        Captions scored individually on an earlier run come straight from the cache, the rest are
+        packed into one JSON request per token budget chunk (sent concurrently, each cached under its
+        own prompt); any entry the model drops or returns malformed is re-scored with score_video().
+        """
+        scores = await asyncio.to_thread(_cached_scores, captions)
+
+        pending = [i for i in range(len(captions)) if i not in scores]
+        chunks = _chunk_captions(captions, pending)
+        results = await asyncio.gather(
+            *(self._score_batch([captions[i] for i in chunk]) for chunk in chunks),
+            return_exceptions=True
+        )
+        for chunk, batch_scores in zip(chunks, results):
+            if isinstance(batch_scores, Exception):
+                logger.error(f"Batch scoring failed for {len(chunk)} captions, falling back to single scoring: {batch_scores}")
+                batch_scores = {}
+            _merge_batch_scores(chunk, batch_scores, scores)
+
+        missing = [i for i in range(len(captions)) if i not in scores]
+        if missing:
+            logger.warning(f"Re-scoring {len(missing)} of {len(captions)} captions individually")
+        for index, score in zip(missing, await asyncio.gather(*(self.score_video(captions[i]) for i in missing))):
+            scores[index] = score
+
+        return [scores[i] for i in range(len(captions))]
+
+    @llm_retry
+    @llm_call
+    async def _score_batch(self, captions: List[str]) -> Dict[int, int]:
+        return await self._complete(
+            settings.GROQ_MODEL_SMALL, BATCH_SCORE_SYSTEM_PROMPT, _batch_payload(captions), SCORE_TEMPERATURE,
+            lambda content: _parse_batch_scores(content, len(captions)),
+            response_format={"type": "json_object"}
+        )
+
+    @llm_retry
+    @llm_call
+    async def generate_hook(self, caption: str) -> str:
         try:
-            response = client.chat.completions.create(
-                model=settings.GROQ_MODEL_SMALL,
-                messages=[
-                    {"role": "system", "content": "You are a YouTube Shorts expert. Write a punchy 3-7 word text hook to overlay on the first 2 seconds of this video, based on its caption. Return ONLY the text of the hook, no quotes, no conversational filler."},
-                    {"role": "user", "content": caption}
-                ],
-                temperature=0.7
+            return await self._complete(
+                settings.GROQ_MODEL_SMALL, HOOK_SYSTEM_PROMPT, caption, 0.7,
+                lambda content: content.strip().replace('"', '')
             )
-            return response.choices[0].message.content.strip().replace('"', '')
         except Exception as e:
             logger.error(f"Failed to generate hook: {e}")
             raise e
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def generate_youtube_metadata(self, caption: str, search_context: str = "") -> dict:
+    @llm_retry
+    @llm_call
+    async def generate_youtube_metadata(self, caption: str, search_context: str = "") -> dict:
         try:
             prompt = f"Original Caption: {caption}\nContext: {search_context}"
-            
-            system_instruction = (
-                "You are an elite YouTube Shorts Growth Hacker running a highly successful faceless channel. "
-                "Your sheer focus is maximizing view velocity, algorithmic reach, and audience retention. "
-                "Given the original Instagram caption of a video, you must repackage it for YouTube Shorts virality:\n\n"
-                "1. TITLE: Write a punchy, curiosity-inducing title under 55 characters. It must create an 'information gap' that forces the viewer to watch. No clickbait, but highly engaging.\n"
-                "2. DESCRIPTION: Write a natural, 1-2 sentence compelling description using conversational 'YouTuber' tone. "
-                "CRITICAL: You MUST include exactly 5 visible #hashtags at the very bottom of this description text, separated by spaces!\n"
-                "3. TAGS: Generate an array of exactly 5 backend keyword tags. The first 2 must be standard viral tags ('shorts', 'viral', 'fyp'). The last 3 must be hyper-specific, high-volume search niche tags targeting the video's core subject.\n\n"
-                "You MUST format the response strictly as valid JSON with the exact keys: 'title' (string), 'description' (string) [ensure the 5 #tags are in this string!], and 'tags' (array of strings)."
-            )
-            
-            response = client.chat.completions.create(
-                model=settings.GROQ_MODEL_LARGE,
-                messages=[
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
+            return await self._complete(
+                settings.GROQ_MODEL_LARGE, METADATA_SYSTEM_PROMPT, prompt, 0.7, json.loads,
                 response_format={"type": "json_object"}
             )
-            import json
-            return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Failed to generate metadata: {e}")
             raise e
+
+    async def analyze(self, caption: str, score: bool = True, hook: bool = True, metadata: bool = True,
+                      search_context: str = "") -> dict:
+        """Run the requested generations concurrently; total latency is that of the slowest call."""
+        jobs = {}
+        if score:
+            jobs["score"] = self.score_video(caption)
+        if hook:
+            jobs["hook"] = self.generate_hook(caption)
+        if metadata:
+            jobs["metadata"] = self.generate_youtube_metadata(caption, search_context)
+        results = await asyncio.gather(*jobs.values())
+        return dict(zip(jobs.keys(), results))
+
+async_ai = AsyncAIService()
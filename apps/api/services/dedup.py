@@ -0,0 +1,64 @@
+import logging
+import threading
+from typing import Iterable, Set
+from supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+class ShortcodeIndex:
+    """
+    Per-worker index of Instagram shortcodes that already have a row in `videos`.
+    Only known IDs are kept locally (rows are never deleted by the pipeline), so a hit is final;
+    unknown IDs are resolved against Supabase in a single `in_` query per batch.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self):
+        self._known: Set[str] = set()
+        self._warmed = False
+        self._lock = threading.Lock()
+
+    def warm(self):
+        known = set()
+        start = 0
+        while True:
+            res = supabase.table("videos").select("instagram_video_id").range(start, start + self.PAGE_SIZE - 1).execute()
+            known.update(row["instagram_video_id"] for row in res.data)
+            if len(res.data) < self.PAGE_SIZE:
+                break
+            start += self.PAGE_SIZE
+        with self._lock:
+            self._known |= known
+            self._warmed = True
+        logger.info(f"Shortcode index warmed with {len(known)} known videos")
+
+    def filter_new(self, shortcodes: Iterable[str]) -> Set[str]:
+        """Return the subset of shortcodes that are not in the videos table yet."""
+        if not self._warmed:
+            try:
+                self.warm()
+            except Exception as e:
+                logger.warning(f"Could not warm shortcode index, falling back to per-batch lookups: {e}")
+
+        with self._lock:
+            unknown = {code for code in shortcodes if code not in self._known}
+        if not unknown:
+            return set()
+
+        # Another worker (or a manual scrape) may have inserted since we warmed, so confirm in one round-trip
+        res = supabase.table("videos").select("instagram_video_id").in_("instagram_video_id", list(unknown)).execute()
+        existing = {row["instagram_video_id"] for row in res.data}
+        with self._lock:
+            self._known |= existing
+        return unknown - existing
+
+    def add(self, shortcode: str):
+        with self._lock:
+            self._known.add(shortcode)
+
+    def __contains__(self, shortcode: str) -> bool:
+        with self._lock:
+            return shortcode in self._known
+
+shortcode_index = ShortcodeIndex()
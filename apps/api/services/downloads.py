@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+import ffmpeg
+import yt_dlp
+from config import settings
+from services.metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+def _is_mp4(f: Dict) -> bool:
+    return f.get("ext") == "mp4"
+
+def _has_video(f: Dict) -> bool:
+    return f.get("vcodec") not in (None, "none")
+
+def _has_audio(f: Dict) -> bool:
+    return f.get("acodec") not in (None, "none")
+
+def _quality(f: Dict):
+    return (f.get("height") or 0, f.get("fps") or 0, f.get("tbr") or 0)
+
+def choose_format(formats: List[Dict]) -> str:
+    """
+    yt-dlp format spec for a reel. A progressive mp4 (audio and video in one file) wins whenever it
+    is at least as tall and as smooth as the best video-only mp4, so there is one request and no mux
+    step; otherwise fall back to the best separate video + m4a audio.
+    """
+    progressive = [f for f in formats if _is_mp4(f) and _has_video(f) and _has_audio(f)]
+    video_only = [f for f in formats if _is_mp4(f) and _has_video(f) and not _has_audio(f)]
+    audio_only = [f for f in formats if f.get("ext") == "m4a" and _has_audio(f) and not _has_video(f)]
+
+    best_progressive = max(progressive, key=_quality, default=None)
+    best_video = max(video_only, key=_quality, default=None)
+    best_audio = max(audio_only, key=lambda f: f.get("abr") or f.get("tbr") or 0, default=None)
+
+    if best_progressive and (
+        not best_video or not best_audio
+        or ((best_progressive.get("height") or 0) >= (best_video.get("height") or 0)
+            and (best_progressive.get("fps") or 0) + 1 >= (best_video.get("fps") or 0))
+    ):
+        return best_progressive["format_id"]
+    if best_video and best_audio:
+        return f"{best_video['format_id']}+{best_audio['format_id']}"
+    return "best[ext=mp4]/best"
+
+class ReelDownloader:
+    """
+    Reel downloads cached by Instagram shortcode.
+    A cached file is reused only if it still has the size recorded when it was downloaded and
+    ffprobe can read it, so a retry or a re-process of the same reel never touches the network.
+    Callers get their own copy of the cached file: a hard link would keep the inode alive after the
+    workspace evicts the video, so no disk would be freed. Least recently used entries are evicted
+    beyond `max_bytes`, and the workspace trims the cache further when it needs the space
+    (see Workspace.register_cache).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, concurrent_fragments: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.concurrent_fragments = concurrent_fragments
+        self._lock = threading.Lock()
+
+    def _paths(self, shortcode: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base = os.path.join(self.cache_dir, shortcode)
+        return f"{base}.mp4", f"{base}.json"
+
+    def _cached(self, shortcode: str) -> Optional[Dict]:
+        path, meta_path = self._paths(shortcode)
+        if not os.path.exists(path) or not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if os.path.getsize(path) != meta["bytes"]:
+                raise ValueError(f"size {os.path.getsize(path)} != {meta['bytes']}")
+            ffmpeg.probe(path)
+        except Exception as e:
+            logger.warning(f"Discarding corrupt cached download {shortcode}: {e}")
+            for stale in (path, meta_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            return None
+        os.utime(path)
+        return meta
+
+    def fetch(self, url: str, output_dir: str, shortcode: Optional[str] = None) -> Dict:
+        """
+        Download `url` into `output_dir`. Returns {path, bytes, seconds, cached, format}.
+        Without a shortcode nothing is cached.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if shortcode:
+            meta = self._cached(shortcode)
+            if meta:
+                dest = os.path.join(output_dir, f"{shortcode}.mp4")
+                self._copy(self._paths(shortcode)[0], dest)
+                logger.info(f"Download cache hit for {shortcode} ({meta['bytes']} bytes)")
+                DOWNLOAD_BYTES.labels(cached="true").inc(meta["bytes"])
+                DOWNLOAD_SECONDS.labels(cached="true").observe(0.0)
+                return {"path": dest, "bytes": meta["bytes"], "seconds": 0.0, "cached": True, "format": meta.get("format")}
+
+        result = self._download(url, output_dir, shortcode or str(uuid.uuid4()))
+        DOWNLOAD_BYTES.labels(cached="false").inc(result["bytes"])
+        DOWNLOAD_SECONDS.labels(cached="false").observe(result["seconds"])
+        logger.info(
+            f"Downloaded {shortcode or url}: {result['bytes']} bytes in {result['seconds']:.1f}s "
+            f"({result['bytes'] / max(result['seconds'], 0.001) / 1024 / 1024:.1f} MB/s, format {result['format']})"
+        )
+        if shortcode:
+            path, meta_path = self._paths(shortcode)
+            self._copy(result["path"], path)
+            with open(f"{meta_path}.part", "w") as f:
+                json.dump({"bytes": result["bytes"], "format": result["format"], "url": url}, f)
+            os.replace(f"{meta_path}.part", meta_path)
+            self._evict()
+        return result
+
+    def _download(self, url: str, output_dir: str, name: str) -> Dict:
+        ydl_opts = {
+            'outtmpl': os.path.join(output_dir, f"{name}.%(ext)s"),
+            'quiet': True,
+            'concurrent_fragment_downloads': self.concurrent_fragments,
+            'merge_output_format': 'mp4',
+        }
+        started = time.monotonic()
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+                spec = choose_format(info.get("formats") or [info])
+            # Reuse the extracted info: only the format selection changes
+            with yt_dlp.YoutubeDL({**ydl_opts, 'format': spec}) as ydl:
+                info = ydl.process_ie_result(info, download=True)
+        except Exception as e:
+            raise Exception(f"Failed to download video: {e}")
+        path = os.path.join(output_dir, f"{name}.{info.get('ext', 'mp4')}")
+        return {
+            "path": path,
+            "bytes": os.path.getsize(path),
+            "seconds": time.monotonic() - started,
+            "cached": False,
+            "format": info.get("format_id") or spec
+        }
+
+    @staticmethod
+    def _copy(src: str, dest: str):
+        tmp_path = f"{dest}.{uuid.uuid4().hex[:8]}.part"
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".mp4") and ".part" not in name:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def shrink(self, bytes_to_free: int) -> int:
+        """Remove least recently used downloads until `bytes_to_free` are gone. Returns the bytes freed."""
+        freed = 0
+        with self._lock:
+            for _, size, path in sorted(self._entries()):
+                if freed >= bytes_to_free:
+                    break
+                try:
+                    os.remove(path)
+                    os.remove(f"{os.path.splitext(path)[0]}.json")
+                except OSError:
+                    pass
+                freed += size
+        return freed
+
+    def _evict(self):
+        self.shrink(self.usage() - self.max_bytes)
+
+reel_downloader = ReelDownloader(
+    settings.DOWNLOAD_CACHE_DIR, settings.DOWNLOAD_CACHE_MAX_BYTES, settings.DOWNLOAD_CONCURRENT_FRAGMENTS
+)
@@ -0,0 +1,78 @@
+from typing import Dict, Optional
+
+DEFAULT_PROFILE = "balanced"
+
+# threads=0 lets x264 use every core, which is what we want on the single CPU-bound worker
+ENCODE_PROFILES: Dict[str, Dict] = {
+    "fast": {
+        "label": "Fast",
+        "preset": "veryfast",
+        "crf": 26,
+        "threads": 0,
+        "scale": None
+    },
+    "balanced": {
+        "label": "Balanced",
+        "preset": "medium",
+        "crf": 23,
+        "threads": 0,
+        "scale": None
+    },
+    "quality": {
+        "label": "Quality",
+        "preset": "slow",
+        "crf": 19,
+        "threads": 0,
+        "scale": None
+    },
+    "shorts_1080p": {
+        "label": "Shorts 1080x1920",
+        "preset": "medium",
+        "crf": 21,
+        "threads": 0,
+        "scale": (1080, 1920),
+        # CRF with a VBV cap; the cap shrinks for long clips so the file stays under max_file_mb
+        "max_bitrate_kbps": 8000,
+        "max_file_mb": 100
+    }
+}
+
+AUDIO_BITRATE_KBPS = 128
+
+def get_profile(name: Optional[str]) -> Dict:
+    return ENCODE_PROFILES.get(name or DEFAULT_PROFILE, ENCODE_PROFILES[DEFAULT_PROFILE])
+
+def video_bitrate_cap(profile: Dict, duration: float) -> Optional[int]:
+    """Max video bitrate in kbps for this clip, or None if the profile is uncapped."""
+    cap = profile.get("max_bitrate_kbps")
+    if not cap:
+        return None
+    if profile.get("max_file_mb") and duration > 0:
+        budget_kbps = profile["max_file_mb"] * 8 * 1024 * 0.95 / duration - AUDIO_BITRATE_KBPS
+        cap = min(cap, max(int(budget_kbps), 500))
+    return cap
+
+def output_args(profile: Dict, duration: float = 0) -> Dict:
+    """ffmpeg output kwargs for an H.264/AAC encode with this profile."""
+    args = {
+        "vcodec": "libx264",
+        "acodec": "aac",
+        "preset": profile["preset"],
+        "crf": profile["crf"],
+        "threads": profile["threads"],
+        "audio_bitrate": f"{AUDIO_BITRATE_KBPS}k"
+    }
+    cap = video_bitrate_cap(profile, duration)
+    if cap:
+        args["maxrate"] = f"{cap}k"
+        args["bufsize"] = f"{cap * 2}k"
+    return args
+
+def apply_scale(video, profile: Dict):
+    """Fit the video inside the profile's frame, padding the rest with black."""
+    if not profile.get("scale"):
+        return video
+    width, height = profile["scale"]
+    return video.filter('scale', width, height, force_original_aspect_ratio='decrease', force_divisible_by=2)\
+                .filter('pad', width, height, '(ow-iw)/2', '(oh-ih)/2')\
+                .filter('setsar', 1)
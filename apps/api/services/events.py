@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Set
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "reelflow:events"
+# Slow clients drop events rather than grow memory; they resync from the list endpoints
+SUBSCRIBER_QUEUE_SIZE = 256
+PUMP_POLL_SECONDS = 1.0
+
+class EventBroadcaster:
+    """
+    Status changes of scrape_jobs, pipeline_jobs and videos for the live dashboard.
+    Celery tasks publish to a Redis channel; each API process holds a single subscription and fans
+    events out to its SSE clients, so open tabs cost no database queries at all.
+    With the "local" backend events only reach subscribers in the publishing process (tests,
+    eager tasks, single-process dev).
+    """
+
+    def __init__(self, backend: str, redis_url: str):
+        self.backend = backend.lower()
+        self.redis_url = redis_url
+        self._redis = None
+        self._subscribers: Set[tuple] = set()
+        self._lock = threading.Lock()
+        self._pump: Optional[asyncio.Task] = None
+
+    def _client(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2)
+        return self._redis
+
+    def publish(self, table: str, row_id: str, **changes):
+        """Fire-and-forget: a failed publish must never fail the task that changed the row."""
+        event = {"table": table, "id": row_id, **changes, "at": datetime.now(timezone.utc).isoformat()}
+        if self.backend == "redis":
+            try:
+                self._client().publish(CHANNEL, json.dumps(event, default=str))
+            except Exception as e:
+                logger.debug(f"Event publish failed: {e}")
+        else:
+            self._dispatch(event)
+
+    def _dispatch(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    @contextlib.contextmanager
+    def subscribe(self):
+        """Queue of events for one client while the block is open. Call from the event loop."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        entry = (loop, queue)
+        with self._lock:
+            self._subscribers.add(entry)
+        if self.backend == "redis" and (self._pump is None or self._pump.done()):
+            self._pump = loop.create_task(self._pump_redis())
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.discard(entry)
+
+    def _has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    async def _pump_redis(self):
+        """Relay the Redis channel to local subscribers; returns once the last one has left."""
+        import redis.asyncio as aioredis
+
+        backoff = 1
+        while self._has_subscribers():
+            client = aioredis.from_url(self.redis_url)
+            pubsub = client.pubsub()
+            failed = False
+            try:
+                await pubsub.subscribe(CHANNEL)
+                backoff = 1
+                # Polled with a timeout so an idle channel still notices that nobody is listening
+                while self._has_subscribers():
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=PUMP_POLL_SECONDS)
+                    if message and message["type"] == "message":
+                        self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event subscription dropped, reconnecting in {backoff}s: {e}")
+                failed = True
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception as e:
+                    logger.debug(f"Closing event subscription failed: {e}")
+            if failed:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+broadcaster = EventBroadcaster(settings.EVENTS_BACKEND, settings.REDIS_URL)
+publish_event = broadcaster.publish
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import threading
+import urllib.request
+import uuid
+from typing import Dict, Optional
+import ffmpeg
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class HookAssetCache:
+    """
+    Local cache for hook intro videos.
+    Sources are keyed by URL + ETag/size so a re-uploaded hook with the same name is picked up,
+    and each source keeps pre-transcoded variants per target (width, height, fps, audio layout),
+    so the scale/crop pass runs once per hook per resolution instead of once per video.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def _source_key(self, url: str) -> str:
+        validator = ""
+        try:
+            req = urllib.request.Request(url, method="HEAD")
+            with urllib.request.urlopen(req, timeout=10) as res:
+                validator = f"{res.headers.get('ETag', '')}:{res.headers.get('Content-Length', '')}"
+        except Exception as e:
+            # Offline or HEAD not allowed: fall back to the URL alone and trust whatever is cached
+            logger.warning(f"HEAD failed for hook {url}, using URL-only cache key: {e}")
+        return hashlib.sha256(f"{url}|{validator}".encode("utf8")).hexdigest()[:32]
+
+    def get_source(self, url: str) -> str:
+        path = self._path(self._source_key(url))
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        urllib.request.urlretrieve(url, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict()
+        return path
+
+    def get_variant(self, url: str, target: Dict) -> str:
+        """Return a local intro matching `target` (see VideoProcessor.get_stream_profile), transcoding on first use."""
+        source_path = self.get_source(url)
+        source_key = os.path.splitext(os.path.basename(source_path))[0]
+        target_key = (
+            f"{target['width']}x{target['height']}@{target.get('fps')}|{target.get('pix_fmt')}|{target.get('profile')}"
+            f"|{target.get('sample_rate')}|{target.get('channel_layout')}|{target.get('level')}|{target.get('time_base')}"
+        )
+        variant_key = f"{source_key}_{hashlib.sha256(target_key.encode('utf8')).hexdigest()[:12]}"
+        path = self._path(variant_key)
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+
+        width, height = target["width"], target["height"]
+        stream = ffmpeg.input(source_path)
+        video = stream.video.filter('scale', width, height, force_original_aspect_ratio='increase')\
+                            .filter('crop', width, height)\
+                            .filter('setsar', 1)
+        if target.get("fps"):
+            video = video.filter('fps', fps=target["fps"])
+        audio = stream.audio
+        if target.get("sample_rate") and target.get("channel_layout"):
+            audio = audio.filter('aformat', sample_rates=target["sample_rate"], channel_layouts=target["channel_layout"])
+
+        # Matching pixel format, H.264 profile / level and time base lets inject_hook stream-copy
+        # the intro junction (see services.video.smart_render_blocker)
+        encode_args = {}
+        if target.get("pix_fmt"):
+            encode_args["pix_fmt"] = target["pix_fmt"]
+        if target.get("profile"):
+            encode_args["profile:v"] = target["profile"]
+        if target.get("level"):
+            encode_args["level"] = f"{target['level'] / 10:.1f}"
+        if target.get("time_base") and "/" in str(target["time_base"]):
+            encode_args["video_track_timescale"] = int(str(target["time_base"]).split("/")[1])
+
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part.mp4"
+        try:
+            ffmpeg.output(video, audio, tmp_path, vcodec='libx264', acodec='aac', **encode_args).run(overwrite_output=True, quiet=True)
+        except ffmpeg.Error as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            err = e.stderr.decode('utf8') if e.stderr else str(e)
+            raise Exception(f"FFmpeg failed to prepare hook intro: {err}")
+        os.replace(tmp_path, path)
+        self._evict()
+        return path
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".mp4") and ".part" not in name:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def shrink(self, bytes_to_free: int) -> int:
+        """Least recently used first (access bumps mtime). Returns the bytes freed."""
+        freed = 0
+        with self._lock:
+            for _, size, path in sorted(self._entries()):
+                if freed >= bytes_to_free:
+                    break
+                try:
+                    os.remove(path)
+                    freed += size
+                except OSError:
+                    pass
+        return freed
+
+    def _evict(self):
+        self.shrink(self.usage() - self.max_bytes)
+
+hook_cache = HookAssetCache(settings.HOOK_CACHE_DIR, settings.HOOK_CACHE_MAX_BYTES)
@@ -0,0 +1,106 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import ffmpeg
+from supabase_client import supabase
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "hooks"
+
+def probe_hook(path: str) -> Dict:
+    """Validate an uploaded intro with ffprobe; returns duration and dimensions or raises."""
+    try:
+        probe = ffmpeg.probe(path)
+    except ffmpeg.Error as e:
+        err = e.stderr.decode('utf8') if e.stderr else str(e)
+        raise ValueError(f"Not a readable video file: {err[-300:]}")
+    video_info = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if video_info is None:
+        raise ValueError("File has no video stream")
+    duration = float(probe.get('format', {}).get('duration') or 0)
+    if duration <= 0:
+        raise ValueError("File has no duration")
+    if duration > settings.HOOK_MAX_DURATION_SECONDS:
+        raise ValueError(f"Hook is {duration:.1f}s long, the limit is {settings.HOOK_MAX_DURATION_SECONDS}s")
+    return {"duration": duration, "width": int(video_info['width']), "height": int(video_info['height'])}
+
+class HookCatalog:
+    """
+    Index of the intro videos in the `hooks` bucket (name, public URL, size, duration, dimensions),
+    kept in the `hook_catalog` table and updated on upload/delete, so listing hooks and picking a
+    random intro is one cached select instead of a storage listing plus a URL per file.
+    Other processes see changes once their TTL expires.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Optional[List[Dict]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            if self._entries is not None and time.monotonic() < self._expires_at:
+                return self._entries
+
+        entries = supabase.table("hook_catalog").select("name", "url", "size_bytes", "duration", "width", "height")\
+            .order("name").execute().data
+        if not entries:
+            # First run after the migration: index whatever is already in the bucket
+            entries = self.rebuild()
+
+        with self._lock:
+            self._entries = entries
+            self._expires_at = time.monotonic() + self.ttl
+        return entries
+
+    def random(self) -> Optional[Dict]:
+        entries = self.list()
+        return random.choice(entries) if entries else None
+
+    def add(self, name: str, size_bytes: int, info: Dict) -> Dict:
+        entry = {
+            "name": name,
+            "url": supabase.storage.from_(BUCKET).get_public_url(name),
+            "size_bytes": size_bytes,
+            "duration": info.get("duration"),
+            "width": info.get("width"),
+            "height": info.get("height"),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        supabase.table("hook_catalog").upsert(entry, on_conflict="name").execute()
+        self.invalidate()
+        return entry
+
+    def remove(self, name: str):
+        supabase.table("hook_catalog").delete().eq("name", name).execute()
+        self.invalidate()
+
+    def rebuild(self) -> List[Dict]:
+        """Index the bucket from a storage listing. Duration and dimensions stay unknown until re-upload."""
+        files = supabase.storage.from_(BUCKET).list()
+        entries = [
+            {
+                "name": f["name"],
+                "url": supabase.storage.from_(BUCKET).get_public_url(f["name"]),
+                "size_bytes": (f.get("metadata") or {}).get("size"),
+                "duration": None,
+                "width": None,
+                "height": None
+            }
+            for f in files if f["name"].endswith(".mp4")
+        ]
+        if entries:
+            supabase.table("hook_catalog").upsert(entries, on_conflict="name").execute()
+        return entries
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+hook_catalog = HookCatalog(settings.HOOK_CATALOG_TTL_SECONDS)
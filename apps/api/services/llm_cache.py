@@ -0,0 +1,152 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from config import settings
+from services.metrics import LLM_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCacheBackend:
+    """
+    Local on-disk backend. Safe to share between Celery worker processes on the same box.
+    Each thread keeps one connection (`with conn:` only commits, it never closes); connections
+    are never carried across a fork.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            # First use in this thread, or a prefork child that inherited its parent's thread state
+            self._local.conn = sqlite3.connect(self.path, timeout=5)
+            self._local.pid = pid
+        return self._local.conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.__dict__.clear()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: int):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            # Drop expired rows first, then least recently used ones above the size bound
+            conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+class RedisCacheBackend:
+    """Shared backend for multi-box deployments. TTL is native, LRU order lives in a sorted set."""
+
+    INDEX_KEY = "llm_cache:lru"
+
+    def __init__(self, url: str, max_entries: int):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis.get(f"llm_cache:{key}")
+        if value is None:
+            self.redis.zrem(self.INDEX_KEY, key)
+            return None
+        self.redis.zadd(self.INDEX_KEY, {key: time.time()})
+        return value.decode("utf8")
+
+    def set(self, key: str, value: str, ttl: int):
+        pipe = self.redis.pipeline()
+        pipe.set(f"llm_cache:{key}", value, ex=ttl)
+        pipe.zadd(self.INDEX_KEY, {key: time.time()})
+        pipe.zcard(self.INDEX_KEY)
+        count = pipe.execute()[-1]
+        if count > self.max_entries:
+            stale = self.redis.zrange(self.INDEX_KEY, 0, count - self.max_entries - 1)
+            if stale:
+                self.redis.delete(*[f"llm_cache:{k.decode('utf8')}" for k in stale])
+                self.redis.zrem(self.INDEX_KEY, *stale)
+
+class LLMCache:
+    """Content-addressed cache for chat completions; hits and misses go to reelflow_llm_cache_requests_total."""
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        raw = json.dumps([model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = None
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                # A broken cache must never break the pipeline, just act as a miss
+                logger.warning(f"LLM cache read failed: {e}")
+        LLM_CACHE_REQUESTS.labels(result="miss" if value is None else "hit").inc()
+        return value
+
+    def set(self, key: str, value: str):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+def create_llm_cache() -> LLMCache:
+    backend = None
+    kind = settings.LLM_CACHE_BACKEND.lower()
+    try:
+        if kind == "sqlite":
+            backend = SQLiteCacheBackend(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES)
+        elif kind == "redis":
+            backend = RedisCacheBackend(settings.REDIS_URL, settings.LLM_CACHE_MAX_ENTRIES)
+    except Exception as e:
+        logger.error(f"Could not initialise '{kind}' LLM cache, caching disabled: {e}")
+    return LLMCache(backend, settings.LLM_CACHE_TTL_SECONDS)
+
+llm_cache = create_llm_cache()
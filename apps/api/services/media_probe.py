@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Dict, List, Optional
+import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# x264 only accepts lowercase profile names without the "Constrained" prefix
+X264_PROFILES = {"baseline": "baseline", "constrained baseline": "baseline", "main": "main", "high": "high"}
+# Keyframes are listed over the start of the clip: enough to see the encoder's GOP and to find
+# the smart render cut after the hook (see VideoProcessor._smart_render)
+GOP_SCAN_SECONDS = 10
+
+def _fps(rate: Optional[str]) -> Optional[float]:
+    try:
+        return round(float(Fraction(rate)), 3) if rate else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _keyframes(path: str) -> List[float]:
+    """Keyframe times from the stream start over the first GOP_SCAN_SECONDS, from packet flags only."""
+    try:
+        probe = ffmpeg.probe(
+            path, select_streams='v:0', show_entries='stream=start_time:packet=pts_time,flags',
+            read_intervals=f'%+{GOP_SCAN_SECONDS}'
+        )
+    except ffmpeg.Error:
+        return []
+    start = float((probe.get('streams') or [{}])[0].get('start_time') or 0)
+    return sorted(
+        round(float(packet['pts_time']) - start, 3) for packet in probe.get('packets', [])
+        if 'K' in packet.get('flags', '') and packet.get('pts_time') not in (None, 'N/A')
+    )
+
+def _gop_seconds(keyframes: List[float]) -> Optional[float]:
+    if len(keyframes) < 2:
+        return None
+    return round((keyframes[-1] - keyframes[0]) / (len(keyframes) - 1), 3)
+
+class MediaProbe:
+    """
+    ffprobe results per file, cached in-process by (path, size, mtime) so the stages and render
+    paths that look at the same file spawn ffprobe once. `info` is JSON-serialisable and is what the
+    pipeline stores in videos.media_info; `remember` seeds the cache from a stored copy.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> tuple:
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def info(self, path: str, with_gop: bool = False) -> Dict:
+        key = self._key(path)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and (not with_gop or "keyframes" in cached):
+                self._entries.move_to_end(key)
+                return dict(cached)
+
+        info = self._probe(path)
+        if with_gop:
+            info["keyframes"] = _keyframes(path)
+            info["gop_seconds"] = _gop_seconds(info["keyframes"])
+        self._store(key, info)
+        return dict(info)
+
+    def remember(self, path: str, info: Dict) -> bool:
+        """Seed the cache with a stored probe result, if it was taken from a file of this size."""
+        key = self._key(path)
+        if info.get("size_bytes") != key[1]:
+            return False
+        self._store(key, dict(info))
+        return True
+
+    def _store(self, key: tuple, info: Dict):
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _probe(path: str) -> Dict:
+        probe = ffmpeg.probe(path)
+        video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+        audio_info = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+        fmt = probe.get('format', {})
+        bit_rate = fmt.get('bit_rate') or video_info.get('bit_rate')
+        return {
+            "width": int(video_info['width']),
+            "height": int(video_info['height']),
+            "fps": video_info.get('r_frame_rate'),
+            "fps_value": _fps(video_info.get('avg_frame_rate') or video_info.get('r_frame_rate')),
+            "vcodec": video_info.get('codec_name'),
+            "pix_fmt": video_info.get('pix_fmt'),
+            "profile": X264_PROFILES.get(str(video_info.get('profile', '')).lower()),
+            # ffprobe reports an unknown level as -99
+            "level": video_info.get('level') if (video_info.get('level') or 0) > 0 else None,
+            "refs": video_info.get('refs'),
+            "time_base": video_info.get('time_base'),
+            "acodec": audio_info.get('codec_name') if audio_info else None,
+            "sample_rate": audio_info.get('sample_rate') if audio_info else None,
+            "channel_layout": audio_info.get('channel_layout') if audio_info else None,
+            "duration": float(fmt.get('duration') or 0),
+            "bitrate_kbps": int(int(bit_rate) / 1000) if bit_rate else None,
+            "size_bytes": int(fmt.get('size') or os.path.getsize(path))
+        }
+
+media_probe = MediaProbe()
@@ -0,0 +1,131 @@
+import asyncio
+import functools
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess, start_http_server
+)
+
+logger = logging.getLogger(__name__)
+
+# Pipeline work ranges from milliseconds (cached LLM answers) to many minutes (encodes, uploads)
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+SHORT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+TASK_SECONDS = Histogram("reelflow_task_seconds", "Celery task run time", ["task", "state"], buckets=LONG_BUCKETS)
+SCRAPE_SECONDS = Histogram("reelflow_scrape_seconds", "Instagram scrape time per account", ["account", "outcome"], buckets=LONG_BUCKETS)
+LLM_SECONDS = Histogram("reelflow_llm_seconds", "LLM call time per AI service method (one attempt)", ["method", "outcome"], buckets=LONG_BUCKETS)
+LLM_RETRIES = Counter("reelflow_llm_retries_total", "LLM call retries per AI service method", ["method"])
+LLM_CACHE_REQUESTS = Counter("reelflow_llm_cache_requests_total", "LLM response cache lookups", ["result"])
+DOWNLOAD_SECONDS = Histogram("reelflow_download_seconds", "Reel download time", ["cached"], buckets=LONG_BUCKETS)
+DOWNLOAD_BYTES = Counter("reelflow_download_bytes_total", "Reel bytes downloaded or served from the cache", ["cached"])
+ENCODE_SECONDS = Histogram("reelflow_encode_seconds", "ffmpeg time to produce the final video", ["path"], buckets=LONG_BUCKETS)
+UPLOAD_SECONDS = Histogram("reelflow_upload_seconds", "YouTube upload time", ["outcome"], buckets=LONG_BUCKETS)
+UPLOAD_BYTES = Counter("reelflow_upload_bytes_total", "Bytes of videos uploaded to YouTube")
+SUPABASE_SECONDS = Histogram(
+    "reelflow_supabase_seconds", "Supabase request latency (until response headers)", ["table", "method", "status"],
+    buckets=SHORT_BUCKETS
+)
+
+# Histograms whose `outcome` label timed() fills in with ok/error
+_WITH_OUTCOME = {SCRAPE_SECONDS, LLM_SECONDS, UPLOAD_SECONDS}
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the block's duration."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        if histogram in _WITH_OUTCOME:
+            labels["outcome"] = outcome
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+def llm_call(func):
+    """Time each attempt of an AI service method (put it under @retry)."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with timed(LLM_SECONDS, method=func.__name__):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with timed(LLM_SECONDS, method=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def record_llm_retry(retry_state):
+    """tenacity before_sleep hook."""
+    LLM_RETRIES.labels(method=retry_state.fn.__name__).inc()
+
+def _supabase_target(url) -> str:
+    # /rest/v1/<table>, /rest/v1/rpc/<function>, /storage/v1/object/<bucket>/...
+    parts = [p for p in urlparse(str(url)).path.split("/") if p]
+    if len(parts) >= 3 and parts[0] == "rest":
+        return f"rpc:{parts[3]}" if parts[2] == "rpc" and len(parts) > 3 else parts[2]
+    if len(parts) >= 4 and parts[0] == "storage":
+        return f"storage:{parts[3]}"
+    return "other"
+
+def instrument_supabase(client):
+    """Time every PostgREST and Storage request of a supabase-py client through httpx event hooks."""
+    def on_request(request):
+        request.extensions["reelflow_start"] = time.perf_counter()
+
+    def on_response(response):
+        start = response.request.extensions.get("reelflow_start")
+        if start is not None:
+            SUPABASE_SECONDS.labels(
+                table=_supabase_target(response.request.url), method=response.request.method, status=str(response.status_code)
+            ).observe(time.perf_counter() - start)
+
+    for name in ("postgrest", "storage"):
+        try:
+            # Both sub-clients keep one httpx session that every table / bucket proxy shares
+            session = getattr(client, name).session
+            session.event_hooks["request"].append(on_request)
+            session.event_hooks["response"].append(on_response)
+        except Exception as e:
+            logger.warning(f"Supabase {name} metrics disabled: {e}")
+
+def registry():
+    """The registry to expose: aggregated over all processes when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return collector_registry
+    return REGISTRY
+
+def render():
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+def start_worker_exporter(port: int):
+    """
+    Serve /metrics for a Celery worker from its main process. The prefork children each write their
+    samples to PROMETHEUS_MULTIPROC_DIR, which is emptied here so a restart doesn't resurrect old counts.
+    """
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+    else:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, worker metrics only cover the main process")
+    try:
+        start_http_server(port, registry=registry())
+        logger.info(f"Worker metrics on :{port}/metrics")
+    except OSError as e:
+        logger.warning(f"Worker metrics exporter not started on :{port}: {e}")
+
+def mark_process_dead(pid: int):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
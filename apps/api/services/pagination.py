@@ -0,0 +1,51 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+MAX_PAGE_SIZE = 100
+# Always selected: the cursor is built from them
+KEY_COLUMNS = ("id", "created_at")
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["created_at"], row["id"]]).encode("utf8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        # Both end up inside a PostgREST filter string, so only accept what they claim to be
+        datetime.fromisoformat(created_at)
+        return created_at, str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_columns(fields: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> List[str]:
+    """Validate a comma-separated `fields` parameter against the columns a list endpoint exposes."""
+    allowed = set(allowed)
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(default)
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(KEY_COLUMNS) + [c for c in columns if c not in KEY_COLUMNS]
+
+def parse_list(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def keyset_page(query, cursor: Optional[str], limit: int):
+    """
+    Newest-first page of a PostgREST select on (created_at, id), seeking past `cursor` instead of
+    using an OFFSET, so every page costs the same however deep it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # Double quotes keep the timestamp's ':' '.' '+' from being read as filter syntax
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+    rows = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
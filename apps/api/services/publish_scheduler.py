@@ -0,0 +1,43 @@
+import heapq
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Dict, List
+
+def _parse_hhmm(value: str) -> time:
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+def window_slots(day: date, start: str, end: str, slots_per_day: int, tz: tzinfo) -> List[datetime]:
+    """
+    Evenly spaced publish times inside the day's [start, end] window, each in the middle of its
+    share of the window. A window whose end is not after its start runs past midnight.
+    """
+    window_start = datetime.combine(day, _parse_hhmm(start), tzinfo=tz)
+    window_end = datetime.combine(day, _parse_hhmm(end), tzinfo=tz)
+    if window_end <= window_start:
+        window_end += timedelta(days=1)
+    step = (window_end - window_start) / slots_per_day
+    return [window_start + step * (i + 0.5) for i in range(slots_per_day)]
+
+def upcoming_slots(now: datetime, start: str, end: str, slots_per_day: int, tz: tzinfo, days: int = 2) -> List[datetime]:
+    """All slots after `now` in today's and the following `days - 1` windows, in order."""
+    today = now.astimezone(tz).date()
+    slots = []
+    for offset in range(days):
+        slots.extend(s for s in window_slots(today + timedelta(days=offset), start, end, slots_per_day, tz) if s > now)
+    return slots
+
+def rank_key(video: dict):
+    # heapq is a min-heap: best AI score first, then most Instagram views, then oldest
+    return (-(video.get("ai_score") or 0), -(video.get("instagram_views") or 0), video.get("created_at") or "")
+
+def plan_slots(videos: List[dict], slots: List[datetime]) -> Dict[str, datetime]:
+    """Assign the best-ranked videos to the earliest slots. Videos beyond the available slots stay unplanned."""
+    heap = [(rank_key(video), video["id"]) for video in videos]
+    heapq.heapify(heap)
+    plan = {}
+    for slot in slots:
+        if not heap:
+            break
+        _, video_id = heapq.heappop(heap)
+        plan[video_id] = slot
+    return plan
@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import Dict
+
+class TokenBucket:
+    """Thread-safe token bucket. `rate` tokens are added per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1):
+        """Block until `tokens` are available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+def limiter_for(host: str, rate: float, capacity: int) -> TokenBucket:
+    """Return the process-wide bucket for a target host, creating it on first use."""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = TokenBucket(rate, capacity)
+        return _limiters[host]
@@ -1,9 +1,29 @@
 import instaloader
 import logging
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple, Union
+from config import settings
+from services.rate_limit import limiter_for
+from services.metrics import timed, SCRAPE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+INSTAGRAM_HOST = "www.instagram.com"
+
+class SharedRateController(instaloader.RateController):
+    """Adds a host-wide token bucket on top of instaloader's own per-session throttling,
+    so parallel scrapers together stay under Instagram's limits."""
+
+    def wait_before_query(self, query_type: str) -> None:
+        limiter_for(
+            INSTAGRAM_HOST,
+            rate=settings.INSTAGRAM_REQUESTS_PER_MINUTE / 60,
+            capacity=settings.INSTAGRAM_REQUEST_BURST
+        ).acquire()
+        super().wait_before_query(query_type)
+
 class InstagramScraper:
     def __init__(self):
         # We explicitly turn off extra downloads to only get the metadata we need quickly
@@ -14,7 +34,8 @@ class InstagramScraper:
             download_comments=False,
             save_metadata=False,
             compress_json=False,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            rate_controller=lambda ctx: SharedRateController(ctx)
         )
 
     def get_recent_reels(self, username: str, limit: int = 10) -> List[Dict]:
@@ -23,13 +44,33 @@ class InstagramScraper:
         Returns a list of dicts with id, url, views, and caption.
         Throws an Exception if it hits a hard block or rate limit.
         """
+        return self.get_new_reels(username, cursor=None, limit=limit)[0]
+
+    def get_new_reels(self, username: str, cursor: Optional[Dict] = None, limit: int = 10) -> Tuple[List[Dict], Dict]:
+        """
+        Incremental variant of get_recent_reels.
+        `cursor` is the high-water mark from the previous run ({profile_id, shortcode, taken_at});
+        walking stops at the first post that is not newer than it. Returns (reels, new_cursor).
+        """
+        cursor = cursor or {}
+        seen_at = _parse_timestamp(cursor.get("taken_at"))
         try:
-            profile = instaloader.Profile.from_username(self.loader.context, username)
+            profile = self._load_profile(username, cursor.get("profile_id"))
             reels = []
             count = 0
+            newest = None
             
             # get_posts() returns all posts, we filter for videos
             for post in profile.get_posts():
+                # Pinned posts sit on top regardless of age, so they must not end the walk
+                is_known = seen_at is not None and (post.shortcode == cursor.get("shortcode") or post.date_utc <= seen_at)
+                if is_known:
+                    if getattr(post, "is_pinned", False):
+                        continue
+                    break
+                if newest is None or post.date_utc > newest.date_utc:
+                    newest = post
+                
                 count += 1
                 if count > limit * 3: # prevent unbounded scraping if person has no videos
                     break
@@ -39,13 +80,70 @@ class InstagramScraper:
                         "id": post.shortcode,
                         "url": f"https://www.instagram.com/reel/{post.shortcode}/",
                         "views": post.video_view_count if post.video_view_count else 0,
-                        "caption": post.caption or ""
+                        "caption": post.caption or "",
+                        "taken_at": post.date_utc.replace(tzinfo=timezone.utc).isoformat()
                     })
                     
                 if len(reels) >= limit:
                     break
                     
-            return reels
+            new_cursor = {"profile_id": profile.userid, "shortcode": cursor.get("shortcode"), "taken_at": cursor.get("taken_at")}
+            if newest is not None:
+                new_cursor["shortcode"] = newest.shortcode
+                new_cursor["taken_at"] = newest.date_utc.replace(tzinfo=timezone.utc).isoformat()
+            return reels, new_cursor
         except Exception as e:
             logger.error(f"Failed to scrape {username}: {str(e)}")
             raise e
+
+    def _load_profile(self, username: str, profile_id: Optional[int] = None) -> instaloader.Profile:
+        # The cached numeric id survives username changes and lets instaloader skip the profile page lookup
+        if profile_id:
+            try:
+                return instaloader.Profile.from_id(self.loader.context, int(profile_id))
+            except Exception as e:
+                logger.warning(f"Cached profile id {profile_id} for {username} failed, looking up by username: {e}")
+        return instaloader.Profile.from_username(self.loader.context, username)
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    # instaloader's date_utc is naive UTC, so normalise stored timestamps to the same
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+_thread_scrapers = threading.local()
+
+def _thread_scraper() -> InstagramScraper:
+    # Instaloader sessions are not thread-safe, so every pool thread gets its own
+    if not hasattr(_thread_scrapers, "scraper"):
+        _thread_scrapers.scraper = InstagramScraper()
+    return _thread_scrapers.scraper
+
+def scrape_accounts(usernames: List[str], limit: int = 10, max_workers: Optional[int] = None,
+                    cursors: Optional[Dict[str, Dict]] = None) -> Dict[str, Union[Tuple[List[Dict], Dict], Exception]]:
+    """
+    Scrape several profiles in parallel on a bounded thread pool.
+    Returns {username: (reels, new_cursor)} where a failed account maps to its exception instead of
+    aborting the whole run. All threads share the Instagram token bucket.
+    """
+    max_workers = max_workers or settings.SCRAPE_CONCURRENCY
+    cursors = cursors or {}
+    results: Dict[str, Union[Tuple[List[Dict], Dict], Exception]] = {}
+    if not usernames:
+        return results
+
+    def scrape(username: str):
+        with timed(SCRAPE_SECONDS, account=username):
+            return _thread_scraper().get_new_reels(username, cursor=cursors.get(username), limit=limit)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(usernames)), thread_name_prefix="ig-scrape") as pool:
+        futures = {username: pool.submit(scrape, username) for username in usernames}
+        for username, future in futures.items():
+            try:
+                results[username] = future.result()
+            except Exception as e:
+                results[username] = e
+    return results
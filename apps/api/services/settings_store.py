@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class FileSettingsStore:
+    """
+    User settings in a JSON file, parsed once per change instead of once per read.
+    Every load is a single stat(): a save from any process replaces the file (new inode and mtime),
+    so API and Celery worker processes see the change on their next read. Saves write a temp file
+    and rename it over the old one, so readers only ever see a complete file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._data: Optional[Dict] = None
+
+    @staticmethod
+    def _signature_of(stat):
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self) -> Optional[Dict]:
+        """The stored settings, or None if nothing has been saved yet."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = self._signature_of(stat)
+        with self._lock:
+            if signature == self._signature:
+                return dict(self._data)
+
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        with self._lock:
+            self._signature, self._data = signature, data
+        return dict(data)
+
+    def save(self, data: Dict):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._signature, self._data = self._signature_of(os.stat(self.path)), dict(data)
+
+class DatabaseSettingsStore:
+    """
+    User settings in the single-row `app_settings` table, for deployments where the API and the
+    workers don't share a disk. Each load asks only for the row's version and re-reads the JSON
+    when it changed; saves bump the version through the `save_app_settings` RPC.
+    The version check itself is skipped for `ttl` seconds after the last one, so other processes
+    see a save once their TTL expires.
+    An empty table is seeded once from `seed` (the old settings file).
+    """
+
+    def __init__(self, client, seed: Optional[FileSettingsStore] = None, ttl: float = 0.0):
+        self.client = client
+        self.seed = seed
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._data: Optional[Dict] = None
+        self._expires_at = 0.0
+
+    def load(self) -> Optional[Dict]:
+        with self._lock:
+            if self._data is not None and time.monotonic() < self._expires_at:
+                return dict(self._data)
+
+        rows = self.client.table("app_settings").select("version").eq("id", 1).execute().data
+        if not rows:
+            data = self.seed.load() if self.seed else None
+            if data is not None:
+                logger.info("Seeding app_settings from the settings file")
+                self.save(data)
+            return data
+        with self._lock:
+            if rows[0]["version"] == self._version:
+                self._expires_at = time.monotonic() + self.ttl
+                return dict(self._data)
+
+        row = self.client.table("app_settings").select("data", "version").eq("id", 1).execute().data[0]
+        with self._lock:
+            self._version, self._data = row["version"], row["data"]
+            self._expires_at = time.monotonic() + self.ttl
+        return dict(row["data"])
+
+    def save(self, data: Dict):
+        version = self.client.rpc("save_app_settings", {"p_data": data}).execute().data
+        with self._lock:
+            self._version, self._data = version, dict(data)
+            self._expires_at = time.monotonic() + self.ttl
+
+def create_settings_store(kind: str, path: str, client=None, ttl: float = 0.0):
+    if kind.lower() == "database":
+        return DatabaseSettingsStore(client, seed=FileSettingsStore(path), ttl=ttl)
+    return FileSettingsStore(path)
@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+from typing import Optional
+from supabase_client import supabase
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Must match the pipeline statuses in the get_dashboard_stats RPC
+PIPELINE_STATUSES = ["processing", "ready", "retrying", "scheduled", "publishing", "deferred_quota"]
+
+class DashboardStats:
+    """
+    Dashboard counters from the `get_dashboard_stats` RPC (one aggregate over the trigger-maintained
+    `video_status_counts` table), behind a short in-process TTL cache.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Optional[dict] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+
+        try:
+            value = supabase.rpc("get_dashboard_stats").execute().data
+        except Exception as e:
+            # Migration not applied yet: fall back to exact counts so the dashboard keeps working
+            logger.warning(f"get_dashboard_stats RPC failed, using count queries: {e}")
+            value = self._count_queries()
+
+        value = {key: int(value.get(key) or 0) for key in ("total", "pipeline", "published", "youtube_channels", "instagram_accounts")}
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def _count_queries(self) -> dict:
+        def count(query) -> int:
+            res = query.execute()
+            return res.count if res.count is not None else 0
+
+        return {
+            "total": count(supabase.table("videos").select("id", count="exact")),
+            "pipeline": count(supabase.table("videos").select("id", count="exact").in_("status", PIPELINE_STATUSES)),
+            "published": count(supabase.table("videos").select("id", count="exact").eq("status", "published")),
+            "youtube_channels": count(supabase.table("youtube_channels").select("id", count="exact")),
+            "instagram_accounts": count(supabase.table("instagram_accounts").select("id", count="exact"))
+        }
+
+dashboard_stats = DashboardStats(settings.STATS_CACHE_TTL_SECONDS)
@@ -1,32 +1,100 @@
-import yt_dlp
 import ffmpeg
+import logging
 import os
+import shutil
+import tempfile
+import time
 import uuid
-from typing import Optional
+from fractions import Fraction
+from typing import Dict, Optional
+from config import settings
+from services import encode_profiles
+from services.downloads import reel_downloader
+from services.media_probe import media_probe
+from services.metrics import timed, ENCODE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HOOK_SECONDS = 2
+# Everything a decoder takes from the SPS / stream setup: both sides of a stream-copied junction must agree
+COPY_KEYS = (
+    "vcodec", "width", "height", "pix_fmt", "profile", "level", "fps", "time_base",
+    "acodec", "sample_rate", "channel_layout"
+)
+# Smart render only pays off if the first keyframe after the hook is close to it
+MAX_SMART_HEAD_SECONDS = 8
+
+def smart_render_blocker(main: Dict, profile: Dict, intro: Optional[Dict] = None) -> Optional[str]:
+    """Why the smart render cannot stream-copy `main` (and `intro`, if given), or None if it can."""
+    if main.get("vcodec") != "h264" or not main.get("profile"):
+        return "video is not H.264 with a known profile"
+    if main.get("acodec") not in (None, "aac"):
+        return "audio is not AAC"
+    if not main.get("level") or not main.get("fps") or not main.get("time_base"):
+        return "level, frame rate or time base unknown"
+    # Copied GOPs keep the source frame size, so a rescaling profile needs the full encode
+    if profile.get("scale") and tuple(profile["scale"]) != (main["width"], main["height"]):
+        return "the encode profile rescales"
+    if intro is not None:
+        mismatched = [key for key in COPY_KEYS if intro.get(key) != main.get(key)]
+        if mismatched:
+            return f"intro differs in {', '.join(mismatched)}"
+    return None
+
+def _timescale(time_base: str) -> Optional[int]:
+    try:
+        return Fraction(time_base).denominator
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+def _mux_args(main: Dict) -> Dict:
+    # The mpegts intermediates run on a 90 kHz clock; write the mp4 back on the source's time base
+    timescale = _timescale(main.get("time_base"))
+    return {"video_track_timescale": timescale} if timescale else {}
+
+def _draw_hook_text(video, hook_text: str):
+    return video.drawtext(
+        text=hook_text,
+        fontsize=72,
+        fontcolor='white',
+        bordercolor='black',
+        borderw=4,
+        x='(w-text_w)/2',
+        y='(h-text_h)/2 - 150',
+        enable=f'between(t,0,{HOOK_SECONDS})'
+    )
 
 class VideoProcessor:
-    def download_reel(self, url: str, output_dir: str = "/tmp") -> Optional[str]:
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        vid_id = str(uuid.uuid4())
-        out_tmpl = os.path.join(output_dir, f"{vid_id}.%(ext)s")
-        
-        ydl_opts = {
-            'outtmpl': out_tmpl,
-            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-            'quiet': True,
-        }
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                ext = info.get('ext', 'mp4')
-                return os.path.join(output_dir, f"{vid_id}.{ext}")
-        except Exception as e:
-            raise Exception(f"Failed to download video: {e}")
-
-    def inject_hook(self, input_path: str, output_path: str, hook_text: str, intro_mp4_path: Optional[str] = None):
+    def download_reel(self, url: str, output_dir: str = "/tmp", shortcode: Optional[str] = None) -> Optional[str]:
+        """Download a reel (see services.downloads); with a shortcode, repeat downloads come from the cache."""
+        return reel_downloader.fetch(url, output_dir, shortcode=shortcode)["path"]
+
+    def get_stream_profile(self, input_path: str) -> Dict:
+        """Target parameters an intro has to match to be concatenated with this video (plus the rest of the probe)."""
+        return media_probe.info(input_path)
+
+    def inject_hook(self, input_path: str, output_path: str, hook_text: str, intro_mp4_path: Optional[str] = None,
+                    intro_normalized: bool = False, smart_render: Optional[bool] = None, encode_profile: Optional[str] = None):
+        """
+        Prepend the intro (or draw the text hook) onto the video.
+        Pass intro_normalized=True when the intro already matches the video (see HookAssetCache.get_variant)
+        to skip the probe and the per-video scale/crop pass.
+        With smart render on, only the GOPs that change are encoded and the rest is stream-copied;
+        anything incompatible falls back to the full encode below.
+        encode_profile names an entry of services.encode_profiles.ENCODE_PROFILES.
+        """
+        profile = encode_profiles.get_profile(encode_profile)
+        if smart_render is None:
+            smart_render = settings.SMART_RENDER_ENABLED
+        if smart_render:
+            started = time.perf_counter()
+            try:
+                if self._smart_render(input_path, output_path, hook_text, intro_mp4_path, intro_normalized, profile):
+                    ENCODE_SECONDS.labels(path="smart").observe(time.perf_counter() - started)
+                    return output_path
+            except Exception as e:
+                logger.warning(f"Smart render failed, falling back to full encode: {e}")
+
         try:
             main_stream = ffmpeg.input(input_path)
             
@@ -34,16 +102,18 @@ class VideoProcessor:
                 # 1. We have a custom 2-second video to prepend.
                 intro_stream = ffmpeg.input(intro_mp4_path)
                 
-                # Fetch original video properties to ensure the custom intro matches exactly (or the concat fails)
-                probe = ffmpeg.probe(input_path)
-                video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-                width = int(video_info['width'])
-                height = int(video_info['height'])
-                
-                # Force the intro to scale/crop to the exact dimensions of the target video and set SAR/DAR
-                intro_vid = intro_stream.video.filter('scale', width, height, force_original_aspect_ratio='increase')\
-                                              .filter('crop', width, height)\
-                                              .filter('setsar', 1)
+                if intro_normalized:
+                    intro_vid = intro_stream.video.filter('setsar', 1)
+                else:
+                    # Fetch original video properties to ensure the custom intro matches exactly (or the concat fails)
+                    target = self.get_stream_profile(input_path)
+                    width = target["width"]
+                    height = target["height"]
+                    
+                    # Force the intro to scale/crop to the exact dimensions of the target video and set SAR/DAR
+                    intro_vid = intro_stream.video.filter('scale', width, height, force_original_aspect_ratio='increase')\
+                                                  .filter('crop', width, height)\
+                                                  .filter('setsar', 1)
                 intro_aud = intro_stream.audio
                 
                 main_vid = main_stream.video.filter('setsar', 1)
@@ -52,26 +122,132 @@ class VideoProcessor:
                 # Concat the two clips (video tracking + audio tracking)
                 joined = ffmpeg.concat(intro_vid, intro_aud, main_vid, main_aud, v=1, a=1)
                 
-                out = ffmpeg.output(joined.video, joined.audio, output_path, vcodec='libx264', acodec='aac')
+                out = ffmpeg.output(
+                    encode_profiles.apply_scale(joined.video, profile), joined.audio, output_path,
+                    **encode_profiles.output_args(profile, self._duration(input_path))
+                )
                 
             else:
                 # 2. No custom video provided, fallback to the standard 2-second text overlay effect
-                video = main_stream.video.drawtext(
-                    text=hook_text,
-                    fontsize=72,
-                    fontcolor='white',
-                    bordercolor='black',
-                    borderw=4,
-                    x='(w-text_w)/2',
-                    y='(h-text_h)/2 - 150',
-                    enable='between(t,0,2)'
-                )
+                video = _draw_hook_text(main_stream.video, hook_text)
                 
                 audio = main_stream.audio
-                out = ffmpeg.output(video, audio, output_path, vcodec='libx264', acodec='aac')
+                out = ffmpeg.output(
+                    encode_profiles.apply_scale(video, profile), audio, output_path,
+                    **encode_profiles.output_args(profile, self._duration(input_path))
+                )
                 
-            out.run(overwrite_output=True, quiet=True)
+            with timed(ENCODE_SECONDS, path="full"):
+                out.run(overwrite_output=True, quiet=True)
             return output_path
         except ffmpeg.Error as e:
             err = e.stderr.decode('utf8') if e.stderr else str(e)
             raise Exception(f"FFmpeg process failed: {err}")
+
+    def _smart_render(self, input_path: str, output_path: str, hook_text: str,
+                      intro_mp4_path: Optional[str], intro_normalized: bool, profile: Dict) -> bool:
+        """Returns False (without touching output_path) when the fast path does not apply."""
+        main = self.get_stream_profile(input_path)
+        blocker = smart_render_blocker(main, profile)
+        if blocker:
+            logger.info(f"Smart render skipped: {blocker}")
+            return False
+
+        use_intro = bool(intro_mp4_path and os.path.exists(intro_mp4_path))
+        if use_intro and not intro_normalized:
+            return False
+
+        work_dir = tempfile.mkdtemp(prefix="smart_", dir=os.path.dirname(os.path.abspath(output_path)))
+        tmp_output = os.path.join(work_dir, "out.mp4")
+        try:
+            if use_intro:
+                # The junction can only be stream-copied if both sides decode with the same parameters
+                intro = self.get_stream_profile(intro_mp4_path)
+                blocker = smart_render_blocker(main, profile, intro)
+                if blocker:
+                    logger.info(f"Smart render skipped: {blocker}")
+                    return False
+                expected = intro["duration"] + main["duration"]
+                self._concat_copy([intro_mp4_path, input_path], work_dir, tmp_output, main)
+            else:
+                cut = self._first_keyframe_after(input_path, HOOK_SECONDS)
+                if cut is None or cut > MAX_SMART_HEAD_SECONDS:
+                    return False
+                expected = main["duration"]
+                self._render_text_head(input_path, hook_text, cut, main, profile, work_dir, tmp_output)
+
+            # A broken join shows up as a changed stream setup or lost / duplicated time
+            rendered = self.get_stream_profile(tmp_output)
+            changed = [key for key in ("width", "height", "pix_fmt", "profile", "level", "fps") if rendered.get(key) != main.get(key)]
+            if changed:
+                logger.warning(f"Smart render output differs from the source in {', '.join(changed)}, discarding")
+                return False
+            if abs(rendered["duration"] - expected) > 0.5:
+                logger.warning(f"Smart render duration {rendered['duration']:.2f}s != expected {expected:.2f}s, discarding")
+                return False
+            os.replace(tmp_output, output_path)
+            return True
+        except ffmpeg.Error as e:
+            err = e.stderr.decode('utf8') if e.stderr else str(e)
+            logger.warning(f"Smart render ffmpeg error: {err[-500:]}")
+            return False
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _first_keyframe_after(self, input_path: str, seconds: float) -> Optional[float]:
+        # The keyframe list is probed once by the download stage and stored in videos.media_info,
+        # which the transcode stage seeds into media_probe, so this normally spawns no ffprobe
+        keyframes = media_probe.info(input_path, with_gop=True).get("keyframes") or []
+        return next((ts for ts in keyframes if ts >= seconds), None)
+
+    def _render_text_head(self, input_path: str, hook_text: str, cut: float, main: Dict, profile: Dict,
+                          work_dir: str, output_path: str):
+        """
+        Encode [0, cut) with the text overlay, copy the remaining GOPs and the original audio.
+        The head is encoded with the source's profile, level, reference frames and frame rate so its
+        SPS is compatible with the copied tail.
+        """
+        head = os.path.join(work_dir, "head.ts")
+        tail = os.path.join(work_dir, "tail.ts")
+
+        src = ffmpeg.input(input_path)
+        ffmpeg.output(
+            _draw_hook_text(src.video, hook_text), head,
+            t=cut, vcodec='libx264', preset=profile["preset"], crf=profile["crf"], threads=profile["threads"],
+            pix_fmt=main["pix_fmt"], r=main["fps"], level=f"{main['level'] / 10:.1f}", f='mpegts',
+            **({'refs': main["refs"]} if main.get("refs") else {}),
+            **{'profile:v': main["profile"], 'bsf:v': 'h264_mp4toannexb'}
+        ).run(overwrite_output=True, quiet=True)
+
+        # cut is an exact keyframe, so an input seek with stream copy starts right on it
+        ffmpeg.input(input_path, ss=cut).video.output(
+            tail, vcodec='copy', f='mpegts', **{'bsf:v': 'h264_mp4toannexb'}
+        ).run(overwrite_output=True, quiet=True)
+
+        video = self._concat_input([head, tail], work_dir).video
+        streams = [video]
+        if main["acodec"]:
+            streams.append(ffmpeg.input(input_path).audio)
+        ffmpeg.output(*streams, output_path, c='copy', movflags='+faststart', **_mux_args(main)).run(overwrite_output=True, quiet=True)
+
+    def _concat_copy(self, paths, work_dir: str, output_path: str, main: Dict):
+        parts = []
+        for i, path in enumerate(paths):
+            part = os.path.join(work_dir, f"part{i}.ts")
+            ffmpeg.input(path).output(part, c='copy', f='mpegts', **{'bsf:v': 'h264_mp4toannexb'}).run(overwrite_output=True, quiet=True)
+            parts.append(part)
+        joined = self._concat_input(parts, work_dir)
+        ffmpeg.output(joined, output_path, c='copy', movflags='+faststart', **_mux_args(main), **{'bsf:a': 'aac_adtstoasc'}).run(overwrite_output=True, quiet=True)
+
+    def _concat_input(self, paths, work_dir: str):
+        list_path = os.path.join(work_dir, f"concat_{uuid.uuid4().hex[:8]}.txt")
+        with open(list_path, "w") as f:
+            for path in paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        return ffmpeg.input(list_path, f='concat', safe=0)
+
+    def _duration(self, input_path: str) -> float:
+        try:
+            return media_probe.info(input_path)["duration"]
+        except Exception:
+            return 0
@@ -0,0 +1,162 @@
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Marker dropped into a video directory once nothing downstream needs its files
+EVICTABLE_MARKER = ".evictable"
+SCRATCH_DIR = ".scratch"
+
+class WorkspaceFull(Exception):
+    pass
+
+class Workspace:
+    """
+    Disk space for pipeline artifacts on this worker box.
+
+        <root>/<video_id>/            raw download and encoded output of one video, shared by its stages
+        <root>/.scratch/<task_id>/    private to one running task, removed when the task ends
+
+    Tasks write into their scratch directory and move finished files into the video directory, so
+    a crash or a failed attempt never leaves half-written artifacts behind. Video directories are
+    evicted least recently used first, but only after they are marked evictable (the video was
+    published or gave up), whenever the workspace goes over its byte budget or the disk runs low.
+    File caches that feed the pipeline (downloads, hook intros) are registered with register_cache:
+    they count against the same budget and are trimmed once no evictable video is left.
+    """
+
+    def __init__(self, root: str, max_bytes: int, min_free_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self._lock = threading.Lock()
+        self._caches = []
+
+    def register_cache(self, cache):
+        """`cache` provides usage() -> bytes and shrink(bytes_to_free) -> bytes freed."""
+        self._caches.append(cache)
+
+    def video_dir(self, video_id: str) -> str:
+        path = os.path.join(self.root, video_id)
+        os.makedirs(path, exist_ok=True)
+        # Directory mtime is the LRU clock
+        os.utime(path)
+        return path
+
+    @contextlib.contextmanager
+    def task_dir(self, task_id: str = None):
+        path = os.path.join(self.root, SCRATCH_DIR, task_id or uuid.uuid4().hex)
+        os.makedirs(path, exist_ok=True)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def commit(self, scratch_path: str, video_id: str, name: str) -> str:
+        """Move a finished file from a task's scratch directory into the video directory."""
+        final_path = os.path.join(self.video_dir(video_id), name)
+        os.replace(scratch_path, final_path)
+        return final_path
+
+    def admit(self, expected_bytes: int = 0):
+        """
+        Free-space check before a task starts writing. Evicts what it can first; raises WorkspaceFull
+        if the disk would still end up below the configured reserve.
+        """
+        if self._free_bytes() - expected_bytes >= self.min_free_bytes and self.usage() + expected_bytes <= self.max_bytes:
+            return
+        self.evict(expected_bytes)
+        free = self._free_bytes()
+        if free - expected_bytes < self.min_free_bytes:
+            raise WorkspaceFull(f"Only {free // (1024 * 1024)} MB free in {self.root}, need {(expected_bytes + self.min_free_bytes) // (1024 * 1024)} MB")
+
+    def mark_evictable(self, video_id: str):
+        path = os.path.join(self.root, video_id)
+        if os.path.isdir(path):
+            open(os.path.join(path, EVICTABLE_MARKER), "a").close()
+        self.evict()
+
+    def sweep_scratch(self, max_age_seconds: float):
+        """Remove scratch directories left behind by killed workers."""
+        scratch_root = os.path.join(self.root, SCRATCH_DIR)
+        if not os.path.isdir(scratch_root):
+            return
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(scratch_root):
+            path = os.path.join(scratch_root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def release(self, video_id: str):
+        shutil.rmtree(os.path.join(self.root, video_id), ignore_errors=True)
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self._video_dirs()) + self._cache_usage()
+
+    def _cache_usage(self) -> int:
+        return sum(cache.usage() for cache in self._caches)
+
+    def evict(self, reserve_bytes: int = 0):
+        with self._lock:
+            entries = self._video_dirs()
+            total = sum(size for _, size, _ in entries) + self._cache_usage()
+            evictable = sorted(
+                (mtime, size, path) for mtime, size, path in entries
+                if os.path.exists(os.path.join(path, EVICTABLE_MARKER))
+            )
+            for mtime, size, path in evictable:
+                if total + reserve_bytes <= self.max_bytes and self._free_bytes() - reserve_bytes >= self.min_free_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted workspace {os.path.basename(path)} ({size // 1024} KB, idle {int(time.time() - mtime)}s)")
+            for cache in self._caches:
+                over_budget = total + reserve_bytes - self.max_bytes
+                short_on_disk = self.min_free_bytes + reserve_bytes - self._free_bytes()
+                needed = max(over_budget, short_on_disk)
+                if needed <= 0:
+                    break
+                freed = cache.shrink(needed)
+                total -= freed
+                if freed:
+                    logger.info(f"Trimmed {type(cache).__name__} by {freed // 1024} KB")
+            if total + reserve_bytes > self.max_bytes:
+                logger.warning(f"Workspace over budget ({total // (1024 * 1024)} MB) with nothing left to evict")
+
+    def _video_dirs(self):
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name == SCRATCH_DIR or not os.path.isdir(path):
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                # Evicted by another worker process meanwhile
+                continue
+            size = 0
+            for dirpath, _, files in os.walk(path):
+                for file_name in files:
+                    try:
+                        size += os.path.getsize(os.path.join(dirpath, file_name))
+                    except OSError:
+                        pass
+            entries.append((mtime, size, path))
+        return entries
+
+    def _free_bytes(self) -> int:
+        os.makedirs(self.root, exist_ok=True)
+        return shutil.disk_usage(self.root).free
+
+workspace = Workspace(settings.WORKSPACE_DIR, settings.WORKSPACE_MAX_BYTES, settings.WORKSPACE_MIN_FREE_MB * 1024 * 1024)
@@ -1,10 +1,11 @@
 import os
-import google.oauth2.credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from typing import Callable, Optional
+from google.auth.transport.requests import AuthorizedSession
 from google_auth_oauthlib.flow import Flow
-from google.auth.transport.requests import Request
 from config import settings
+from services.youtube_clients import youtube_clients, SCOPES
+from services.youtube_upload import ResumableUploader
+from services.youtube_quota import quota_ledger
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,10 +18,6 @@ CLIENT_SECRETS_FILE = {
         "token_uri": "https://oauth2.googleapis.com/token"
     }
 }
-SCOPES = [
-    'https://www.googleapis.com/auth/youtube.upload',
-    'https://www.googleapis.com/auth/youtube.readonly'
-]
 
 class YouTubeService:
     def get_auth_url(self, redirect_uri: str) -> str:
@@ -40,18 +37,18 @@ class YouTubeService:
             "token_uri": creds.token_uri,
             "client_id": creds.client_id,
             "client_secret": creds.client_secret,
-            "scopes": creds.scopes
+            "scopes": creds.scopes,
+            "expiry": creds.expiry
         }
 
 
 
-    def upload_video(self, credentials_dict: dict, file_path: str, title: str, description: str, tags: list):
-        creds = google.oauth2.credentials.Credentials(**credentials_dict)
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            
-        youtube = build('youtube', 'v3', credentials=creds)
-        
+    def upload_video(self, channel: dict, file_path: str, title: str, description: str, tags: list,
+                     session_uri: Optional[str] = None, on_progress: Optional[Callable[[str, int, int], None]] = None):
+        """
+        Chunked resumable upload. Pass the session_uri reported to on_progress(session_uri, offset, total)
+        by an earlier attempt to continue from its last acknowledged chunk.
+        """
         logger.info(f"Publishing video '{title}' immediately as public.")
         
         body = {
@@ -67,90 +64,76 @@ class YouTubeService:
             }
         }
         
-        media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
-        request = youtube.videos().insert(
-            part=",".join(body.keys()),
-            body=body,
-            media_body=media
+        uploader = ResumableUploader(
+            AuthorizedSession(youtube_clients.credentials(channel)),
+            upload_url=settings.YOUTUBE_UPLOAD_URL,
+            chunk_size=settings.YOUTUBE_UPLOAD_CHUNK_MB * 1024 * 1024
         )
         
+        def report(uri: str, offset: int, total: int):
+            logger.info(f"Uploaded {int(offset * 100 / total) if total else 100}%")
+            if on_progress:
+                on_progress(uri, offset, total)
+        
         try:
-            response = None
-            while response is None:
-                status, response = request.next_chunk()
-                if status:
-                    logger.info(f"Uploaded {int(status.progress() * 100)}%")
-            return response
+            return uploader.upload(file_path, body, part=",".join(body.keys()), session_uri=session_uri, on_progress=report)
         except Exception as e:
             if "quota" in str(e).lower():
                 raise Exception("quotaExceeded")
             raise e
 
-    def get_channel_stats(self, credentials_dict: dict):
-        creds = google.oauth2.credentials.Credentials(**credentials_dict)
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            
-        youtube = build('youtube', 'v3', credentials=creds)
-        
-        ch_res = youtube.channels().list(
-            part="snippet,statistics",
-            mine=True
-        ).execute()
+    def get_channel_analytics(self, channel: dict, limit: int = 5):
+        """
+        Channel stats plus recent video stats in three API calls: channels.list (snippet, statistics
+        and contentDetails at once), playlistItems.list and videos.list batched by 50 IDs.
+        """
+        youtube = youtube_clients.get(channel)
+        channel_id = channel["id"]
         
+        ch_res = youtube.channels().list(part="snippet,statistics,contentDetails", mine=True).execute()
+        quota_ledger.record(channel_id, "channels.list")
         if not ch_res.get("items"):
             return None
             
         channel = ch_res["items"][0]
         stats = channel["statistics"]
         snippet = channel["snippet"]
+        uploads_id = channel["contentDetails"]["relatedPlaylists"]["uploads"]
+        
+        pl_res = youtube.playlistItems().list(
+            part="snippet",
+            playlistId=uploads_id,
+            maxResults=limit
+        ).execute()
+        quota_ledger.record(channel_id, "playlistItems.list")
+        video_ids = [item['snippet']['resourceId']['videoId'] for item in pl_res.get("items", [])]
         
         return {
             "channel_name": snippet["title"],
             "subscriber_count": stats.get("subscriberCount", "0"),
             "view_count": stats.get("viewCount", "0"),
             "video_count": stats.get("videoCount", "0"),
-            "thumbnail": snippet.get("thumbnails", {}).get("default", {}).get("url")
+            "thumbnail": snippet.get("thumbnails", {}).get("default", {}).get("url"),
+            "recent_videos": self._get_videos_stats(youtube, channel_id, video_ids)
         }
 
-    def get_recent_videos_stats(self, credentials_dict: dict, limit: int = 5):
-        creds = google.oauth2.credentials.Credentials(**credentials_dict)
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            
-        youtube = build('youtube', 'v3', credentials=creds)
-        
-        # 1. Get channel's uploads playlist
-        ch_res = youtube.channels().list(part="contentDetails", mine=True).execute()
-        uploads_id = ch_res['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-        
-        # 2. Get recent videos in that playlist
-        pl_res = youtube.playlistItems().list(
-            part="snippet",
-            playlistId=uploads_id,
-            maxResults=limit
-        ).execute()
-        
-        if not pl_res.get("items"):
-            return []
-            
-        video_ids = [item['snippet']['resourceId']['videoId'] for item in pl_res['items']]
-        
-        # 3. Get stats for those videos
-        v_res = youtube.videos().list(
-            part="snippet,statistics",
-            id=",".join(video_ids)
-        ).execute()
-        
+    def _get_videos_stats(self, youtube, channel_id: str, video_ids: list):
         videos_stats = []
-        for item in v_res.get("items", []):
-            videos_stats.append({
-                "id": item["id"],
-                "title": item["snippet"]["title"],
-                "published_at": item["snippet"]["publishedAt"],
-                "view_count": int(item["statistics"].get("viewCount", 0)),
-                "like_count": int(item["statistics"].get("likeCount", 0)),
-                "comment_count": int(item["statistics"].get("commentCount", 0))
-            })
-            
+        # videos.list accepts up to 50 IDs per call
+        for start in range(0, len(video_ids), 50):
+            v_res = youtube.videos().list(
+                part="snippet,statistics",
+                id=",".join(video_ids[start:start + 50]),
+                maxResults=50
+            ).execute()
+            quota_ledger.record(channel_id, "videos.list")
+            for item in v_res.get("items", []):
+                videos_stats.append({
+                    "id": item["id"],
+                    "title": item["snippet"]["title"],
+                    "published_at": item["snippet"]["publishedAt"],
+                    "view_count": int(item["statistics"].get("viewCount", 0)),
+                    "like_count": int(item["statistics"].get("likeCount", 0)),
+                    "comment_count": int(item["statistics"].get("commentCount", 0))
+                })
         return videos_stats
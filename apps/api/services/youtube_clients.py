@@ -0,0 +1,129 @@
+import functools
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import google.oauth2.credentials
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build, build_from_document
+from config import settings
+from supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+SCOPES = [
+    'https://www.googleapis.com/auth/youtube.upload',
+    'https://www.googleapis.com/auth/youtube.readonly'
+]
+# Refresh a bit before Google would reject the token, so no call races the expiry
+REFRESH_MARGIN = timedelta(minutes=5)
+
+@functools.lru_cache(maxsize=1)
+def _discovery_document() -> Optional[str]:
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        return get_static_doc("youtube", "v3")
+    except Exception:
+        return None
+
+def build_client(creds):
+    """build('youtube', 'v3') without re-reading the discovery document every time."""
+    doc = _discovery_document()
+    if doc:
+        return build_from_document(doc, credentials=creds)
+    return build('youtube', 'v3', credentials=creds, cache_discovery=False)
+
+def _parse_expiry(value: Optional[str]) -> Optional[datetime]:
+    # google-auth compares against naive UTC datetimes
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class YouTubeClientRegistry:
+    """
+    Per-channel YouTube API clients.
+    Credentials are shared per process and refreshed proactively from `token_expires_at`; refreshed
+    tokens are written back to youtube_channels, so other threads and Celery worker processes pick
+    them up instead of refreshing again. API clients (httplib2 based, not thread-safe) are cached
+    per thread and rebuilt only when the channel's credentials object changes.
+    """
+
+    def __init__(self):
+        self._creds: Dict[str, google.oauth2.credentials.Credentials] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _lock_for(self, channel_id: str) -> threading.Lock:
+        with self._registry_lock:
+            return self._locks.setdefault(channel_id, threading.Lock())
+
+    def _credentials_from_row(self, channel: dict):
+        return google.oauth2.credentials.Credentials(
+            token=channel["access_token"],
+            refresh_token=channel["refresh_token"],
+            token_uri=TOKEN_URI,
+            client_id=settings.YOUTUBE_CLIENT_ID,
+            client_secret=settings.YOUTUBE_CLIENT_SECRET,
+            scopes=SCOPES,
+            expiry=_parse_expiry(channel.get("token_expires_at"))
+        )
+
+    @staticmethod
+    def _needs_refresh(creds) -> bool:
+        # Unknown expiry: refresh once so it becomes known (and persisted)
+        return creds.expiry is None or creds.expiry - REFRESH_MARGIN <= datetime.utcnow()
+
+    def credentials(self, channel: dict):
+        channel_id = channel["id"]
+        with self._lock_for(channel_id):
+            creds = self._creds.get(channel_id)
+            if creds is None or creds.refresh_token != channel["refresh_token"]:
+                creds = self._credentials_from_row(channel)
+                self._creds[channel_id] = creds
+
+            if self._needs_refresh(creds):
+                # Another process may already have refreshed and persisted a new token
+                rows = supabase.table("youtube_channels").select("*").eq("id", channel_id).execute().data
+                if rows:
+                    stored = self._credentials_from_row(rows[0])
+                    if not self._needs_refresh(stored):
+                        self._creds[channel_id] = creds = stored
+            if self._needs_refresh(creds) and creds.refresh_token:
+                creds.refresh(Request())
+                self._persist(channel_id, creds)
+            return creds
+
+    def _persist(self, channel_id: str, creds):
+        update = {
+            "access_token": creds.token,
+            "token_expires_at": creds.expiry.replace(tzinfo=timezone.utc).isoformat() if creds.expiry else None,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            supabase.table("youtube_channels").update(update).eq("id", channel_id).execute()
+        except Exception as e:
+            logger.warning(f"Failed to persist refreshed token for channel {channel_id}: {e}")
+
+    def get(self, channel: dict):
+        """Return a ready-to-use YouTube client for a youtube_channels row."""
+        creds = self.credentials(channel)
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        cached = clients.get(channel["id"])
+        if cached is None or cached[0] is not creds:
+            cached = (creds, build_client(creds))
+            clients[channel["id"]] = cached
+        return cached[1]
+
+    def invalidate(self, channel_id: str):
+        with self._lock_for(channel_id):
+            self._creds.pop(channel_id, None)
+        getattr(self._local, "clients", {}).pop(channel_id, None)
+
+youtube_clients = YouTubeClientRegistry()
@@ -0,0 +1,96 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+from config import settings
+from supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# YouTube Data API v3 unit costs for the calls we make
+QUOTA_COSTS = {
+    "videos.insert": 1600,
+    "videos.list": 1,
+    "channels.list": 1,
+    "playlistItems.list": 1
+}
+
+class QuotaLedger:
+    """
+    Per-channel YouTube quota accounting in youtube_quota_ledger, bucketed by the Pacific-time
+    quota day. Publishes reserve their units atomically up front; read calls are recorded after the fact.
+    """
+
+    def __init__(self, daily_limit: int):
+        self.daily_limit = daily_limit
+
+    def quota_day(self, now: Optional[datetime] = None) -> date:
+        return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date()
+
+    def next_reset(self, now: Optional[datetime] = None) -> datetime:
+        """Start of the next quota day, as an aware datetime (usable as a Celery eta)."""
+        next_day = self.quota_day(now) + timedelta(days=1)
+        return datetime.combine(next_day, time(0, 0), tzinfo=QUOTA_TIMEZONE)
+
+    def remaining(self, channel_ids: List[str]) -> Dict[str, int]:
+        if not channel_ids:
+            return {}
+        rows = supabase.table("youtube_quota_ledger").select("channel_id", "units_used")\
+            .eq("quota_day", self.quota_day().isoformat()).in_("channel_id", channel_ids).execute().data
+        used = {row["channel_id"]: row["units_used"] for row in rows}
+        return {channel_id: self.daily_limit - used.get(channel_id, 0) for channel_id in channel_ids}
+
+    def reserve(self, channel_id: str, units: int) -> bool:
+        res = supabase.rpc("reserve_youtube_quota", {
+            "p_channel_id": channel_id,
+            "p_quota_day": self.quota_day().isoformat(),
+            "p_units": units,
+            "p_limit": self.daily_limit
+        }).execute()
+        return bool(res.data)
+
+    def refund(self, channel_id: str, units: int, quota_day: date):
+        """Give back a reservation that was never spent (the upload failed before YouTube saw it)."""
+        try:
+            supabase.rpc("spend_youtube_quota", {
+                "p_channel_id": channel_id,
+                "p_quota_day": quota_day.isoformat(),
+                "p_units": -units
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Failed to refund {units} quota units to channel {channel_id}: {e}")
+
+    def record(self, channel_id: str, call: str, count: int = 1):
+        # Bookkeeping must never break the API call it is accounting for
+        try:
+            supabase.rpc("spend_youtube_quota", {
+                "p_channel_id": channel_id,
+                "p_quota_day": self.quota_day().isoformat(),
+                "p_units": QUOTA_COSTS[call] * count
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Failed to record {call} quota for channel {channel_id}: {e}")
+
+    def mark_exhausted(self, channel_id: str):
+        """YouTube says the channel is out of quota (e.g. usage outside this app): stop routing to it today."""
+        remaining = self.remaining([channel_id]).get(channel_id, 0)
+        if remaining > 0:
+            supabase.rpc("spend_youtube_quota", {
+                "p_channel_id": channel_id,
+                "p_quota_day": self.quota_day().isoformat(),
+                "p_units": remaining
+            }).execute()
+
+    def pick_channel(self, channels: List[dict], units: int) -> Optional[dict]:
+        """Reserve `units` on the channel with the most budget left; None if no channel can afford it today."""
+        remaining = self.remaining([channel["id"] for channel in channels])
+        for channel in sorted(channels, key=lambda c: remaining[c["id"]], reverse=True):
+            if remaining[channel["id"]] < units:
+                break
+            if self.reserve(channel["id"], units):
+                return channel
+        return None
+
+quota_ledger = QuotaLedger(settings.YOUTUBE_DAILY_QUOTA)
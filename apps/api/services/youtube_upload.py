@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+# Resumable chunks must be a multiple of 256 KiB (except the last one)
+CHUNK_ALIGNMENT = 256 * 1024
+
+class UploadSessionExpired(Exception):
+    pass
+
+class ResumableUploader:
+    """
+    YouTube resumable upload protocol over any requests-compatible session
+    (google.auth AuthorizedSession in production, a plain requests.Session against a fake endpoint in tests).
+
+    The session URI and acknowledged byte offset are reported through `on_progress` after every
+    chunk, so a caller that persists them can pass them back as `session_uri` on a retry and the
+    upload continues from the last acknowledged chunk instead of byte zero.
+    """
+
+    def __init__(self, session, upload_url: str = YOUTUBE_UPLOAD_URL, chunk_size: int = 8 * 1024 * 1024):
+        self.session = session
+        self.upload_url = upload_url
+        self.chunk_size = max(CHUNK_ALIGNMENT, chunk_size // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT)
+
+    def upload(self, file_path: str, body: dict, part: str, session_uri: Optional[str] = None,
+               on_progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
+        total = os.path.getsize(file_path)
+        offset = 0
+        if session_uri:
+            try:
+                offset, response = self._query_offset(session_uri, total)
+                if response is not None:
+                    return response
+                logger.info(f"Resuming upload at byte {offset}/{total}")
+            except UploadSessionExpired:
+                logger.warning("Upload session expired, starting a new one")
+                session_uri = None
+        if not session_uri:
+            session_uri = self._start_session(body, part, total)
+            offset = 0
+        if on_progress:
+            on_progress(session_uri, offset, total)
+
+        with open(file_path, "rb") as f:
+            while True:
+                f.seek(offset)
+                chunk = f.read(self.chunk_size)
+                end = offset + len(chunk) - 1
+                res = self.session.put(
+                    session_uri,
+                    data=chunk,
+                    headers={
+                        "Content-Length": str(len(chunk)),
+                        "Content-Range": f"bytes {offset}-{end}/{total}" if chunk else f"bytes */{total}"
+                    }
+                )
+                if res.status_code in (200, 201):
+                    if on_progress:
+                        on_progress(session_uri, total, total)
+                    return res.json()
+                if res.status_code == 308:
+                    offset = self._acknowledged(res)
+                    if on_progress:
+                        on_progress(session_uri, offset, total)
+                    continue
+                if res.status_code in (404, 410):
+                    raise UploadSessionExpired(f"Upload session gone ({res.status_code})")
+                self._raise_for_error(res)
+
+    def _start_session(self, body: dict, part: str, total: int) -> str:
+        res = self.session.post(
+            f"{self.upload_url}?uploadType=resumable&part={part}",
+            data=json.dumps(body),
+            headers={
+                "Content-Type": "application/json; charset=UTF-8",
+                "X-Upload-Content-Length": str(total),
+                "X-Upload-Content-Type": "video/mp4"
+            }
+        )
+        if res.status_code != 200:
+            self._raise_for_error(res)
+        return res.headers["Location"]
+
+    def _query_offset(self, session_uri: str, total: int):
+        """Ask the server how much it has. Returns (offset, None) or (total, video) if it already finished."""
+        res = self.session.put(session_uri, data=b"", headers={"Content-Length": "0", "Content-Range": f"bytes */{total}"})
+        if res.status_code in (200, 201):
+            return total, res.json()
+        if res.status_code == 308:
+            return self._acknowledged(res), None
+        if res.status_code in (404, 410):
+            raise UploadSessionExpired(f"Upload session gone ({res.status_code})")
+        self._raise_for_error(res)
+
+    @staticmethod
+    def _acknowledged(res) -> int:
+        # "Range: bytes=0-1048575" means the next byte to send is 1048576; no header means nothing stored yet
+        range_header = res.headers.get("Range")
+        if not range_header:
+            return 0
+        return int(range_header.rsplit("-", 1)[1]) + 1
+
+    @staticmethod
+    def _raise_for_error(res):
+        text = res.text or ""
+        if "quota" in text.lower():
+            raise Exception("quotaExceeded")
+        raise Exception(f"YouTube upload failed ({res.status_code}): {text[:500]}")
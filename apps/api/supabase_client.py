@@ -1,7 +1,9 @@
 from supabase import create_client, Client
 from config import settings
+from services.metrics import instrument_supabase
 
 supabase: Client = create_client(
     settings.SUPABASE_URL,
     settings.SUPABASE_SERVICE_ROLE_KEY
 )
+instrument_supabase(supabase)
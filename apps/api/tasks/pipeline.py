@@ -1,40 +1,106 @@
 import logging
 import os
 import json
-import random
-import urllib.request
-import uuid
 import shutil
+from datetime import datetime, timezone
+from typing import Optional
+from celery import chain, chord, group
+from celery.signals import worker_process_init
 from celery_app import celery_app
+from config import settings
 from supabase_client import supabase
-from services.scraper import InstagramScraper
-from services.ai import AIService
+from services.scraper import InstagramScraper, scrape_accounts
+from services.ai import async_ai
 from services.video import VideoProcessor
+from services.dedup import shortcode_index
+from services.hook_cache import hook_cache
+from services.hook_catalog import hook_catalog
+from services.events import publish_event
+from services.workspace import workspace, WorkspaceFull
+from services.downloads import reel_downloader
+from services.media_probe import media_probe
+from services.metrics import timed, SCRAPE_SECONDS
 
 logger = logging.getLogger(__name__)
 
 scraper = InstagramScraper()
-ai = AIService()
 video_processor = VideoProcessor()
+# The download and hook caches live next to the workspace and share its disk budget
+workspace.register_cache(reel_downloader)
+workspace.register_cache(hook_cache)
+
+# Scratch directories older than this belong to tasks that died without cleaning up
+STALE_SCRATCH_SECONDS = 6 * 3600
+# How long a download waits for disk space to be freed before trying again
+WORKSPACE_FULL_RETRY_SECONDS = 300
+
+@worker_process_init.connect
+def warm_shortcode_index(**kwargs):
+    try:
+        shortcode_index.warm()
+    except Exception as e:
+        logger.warning(f"Shortcode index warm-up failed, it will warm lazily: {e}")
+
+@worker_process_init.connect
+def sweep_workspace(**kwargs):
+    workspace.sweep_scratch(STALE_SCRATCH_SECONDS)
+    workspace.evict()
+
+def save_scrape_cursor(account_id: str, cursor: dict):
+    """Persist an account's high-water mark. The filter makes the write a no-op if a concurrent
+    run already stored a newer post, so the cursor only ever moves forward."""
+    now = datetime.now(timezone.utc).isoformat()
+    if cursor.get("taken_at"):
+        res = supabase.table("instagram_accounts").update({
+            "instagram_profile_id": cursor.get("profile_id"),
+            "last_seen_shortcode": cursor["shortcode"],
+            "last_seen_post_at": cursor["taken_at"],
+            "last_scraped_at": now
+        }).eq("id", account_id).or_(
+            f"last_seen_post_at.is.null,last_seen_post_at.lte.{cursor['taken_at']}"
+        ).execute()
+        if res.data:
+            return
+    supabase.table("instagram_accounts").update({"last_scraped_at": now}).eq("id", account_id).execute()
+
+def _cursor_after_persisted(reels: list, scraped: dict, previous: dict, pending: set) -> dict:
+    """
+    How far an account's cursor may move once a run has acted on its reels. The cursor is a
+    high-water mark, so it must stay below every reel still `pending` (new but not persisted)
+    or the next run would never see it again: the scraped cursor if nothing is pending, else the
+    newest handled reel older than all pending ones, else the previous position.
+    """
+    pending_at = [reel["taken_at"] for reel in reels if reel["id"] in pending]
+    if not pending_at:
+        return scraped
+    cursor = dict(previous, profile_id=scraped.get("profile_id"))
+    handled = [reel for reel in reels if reel["id"] not in pending and reel["taken_at"] < min(pending_at)]
+    if handled:
+        newest = max(handled, key=lambda reel: reel["taken_at"])
+        cursor["shortcode"], cursor["taken_at"] = newest["id"], newest["taken_at"]
+    return cursor
 
 @celery_app.task(bind=True, max_retries=3)
 def run_scrape_job(self, job_id: str, username: str, min_score: int):
     logger.info(f"Starting scrape job {job_id} for {username}")
     try:
         supabase.table("scrape_jobs").update({"status": "running"}).eq("id", job_id).execute()
+        publish_event("scrape_jobs", job_id, status="running")
         
-        reels = scraper.get_recent_reels(username, limit=10)
+        with timed(SCRAPE_SECONDS, account=username):
+            reels = scraper.get_recent_reels(username, limit=10)
         
         best_reel = None
         highest_score = -1
         
-        for reel in reels:
-            # Check if video already exists
-            existing = supabase.table("videos").select("id").eq("instagram_video_id", reel["id"]).execute()
-            if existing.data:
-                continue
-                
-            score = ai.score_video(reel["caption"])
+        # Drop videos we already have in one lookup instead of one query per reel
+        new_ids = shortcode_index.filter_new(reel["id"] for reel in reels)
+        new_reels = [reel for reel in reels if reel["id"] in new_ids]
+        
+        # Score every new reel in one batched LLM call instead of one call per reel
+        scores = async_ai.run_sync(async_ai.score_videos([reel["caption"] for reel in new_reels])) if new_reels else []
+        
+        for reel, score in zip(new_reels, scores):
             logger.info(f"Reel {reel['id']} score: {score} (min: {min_score})")
             
             if score >= min_score and score > highest_score:
@@ -54,15 +120,18 @@ def run_scrape_job(self, job_id: str, username: str, min_score: int):
                 "ai_score": highest_score,
                 "status": "discovered"
             }).execute()
+            shortcode_index.add(best_reel["id"])
             
             vid_id = video_res.data[0]["id"]
+            publish_event("videos", vid_id, status="discovered")
             
             # Create pipeline job
-            supabase.table("pipeline_jobs").insert({
+            pipeline_res = supabase.table("pipeline_jobs").insert({
                 "video_id": vid_id,
                 "status": "pending",
                 "current_step": "download"
             }).execute()
+            publish_event("pipeline_jobs", pipeline_res.data[0]["id"], video_id=vid_id, status="pending", current_step="download")
             
             # Trigger process task
             process_video.delay(vid_id)
@@ -71,6 +140,7 @@ def run_scrape_job(self, job_id: str, username: str, min_score: int):
             "status": "completed", 
             "videos_found": videos_found
         }).eq("id", job_id).execute()
+        publish_event("scrape_jobs", job_id, status="completed", videos_found=videos_found)
         
     except Exception as e:
         logger.error(f"Job {job_id} failed: {e}")
@@ -78,31 +148,160 @@ def run_scrape_job(self, job_id: str, username: str, min_score: int):
             "status": "failed",
             "error_message": str(e)
         }).eq("id", job_id).execute()
+        publish_event("scrape_jobs", job_id, status="failed", error_message=str(e))
         self.retry(exc=e)
 
+def _latest_pipeline_job_id(video_id: str):
+    jobs = supabase.table("pipeline_jobs").select("id").eq("video_id", video_id).order("created_at", desc=True).limit(1).execute()
+    return jobs.data[0]["id"] if jobs.data else None
+
+def _fail_stage(task, video_id: str, stage: str, e: Exception):
+    logger.error(f"Processing failed at {stage} for {video_id}: {e}")
+    # Only the last attempt marks the video failed; until then it shows as retrying
+    final = task.request.retries >= task.max_retries
+    job_status, video_status = ("failed", "error") if final else ("retrying", "retrying")
+    pipeline_job_id = _latest_pipeline_job_id(video_id)
+    if pipeline_job_id:
+        supabase.table("pipeline_jobs").update({"status": job_status, "current_step": stage, "error_message": str(e)}).eq("id", pipeline_job_id).execute()
+        publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, status=job_status, current_step=stage, error_message=str(e))
+    supabase.table("videos").update({"status": video_status, "error_message": str(e)}).eq("id", video_id).execute()
+    publish_event("videos", video_id, status=video_status, error_message=str(e))
+    if final:
+        # Giving up on this video: nothing will read its artifacts again
+        workspace.mark_evictable(video_id)
+    raise task.retry(exc=e)
+
+def _resume_stage(task, video_id: str, stage: str):
+    """A retried attempt is running: undo the 'retrying' status _fail_stage left behind."""
+    if not task.request.retries:
+        return
+    # Conditional, so a branch that already gave up for good keeps its failed status
+    pipeline_job_id = _latest_pipeline_job_id(video_id)
+    if pipeline_job_id:
+        resumed = supabase.table("pipeline_jobs").update({"status": "running", "current_step": stage, "error_message": None})\
+            .eq("id", pipeline_job_id).eq("status", "retrying").execute()
+        if resumed.data:
+            publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, status="running", current_step=stage)
+    resumed = supabase.table("videos").update({"status": "processing", "error_message": None})\
+        .eq("id", video_id).eq("status", "retrying").execute()
+    if resumed.data:
+        publish_event("videos", video_id, status="processing")
+
+def _reject_video(video_id: str, reason: str):
+    """
+    Stop the pipeline for a video that can never be published, without retrying.
+    The stages still return normally so the chord completes; the ones after it check _is_rejected.
+    """
+    logger.info(f"Rejecting {video_id}: {reason}")
+    pipeline_job_id = _latest_pipeline_job_id(video_id)
+    if pipeline_job_id:
+        supabase.table("pipeline_jobs").update({"status": "failed", "current_step": "probe", "error_message": reason}).eq("id", pipeline_job_id).execute()
+        publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, status="failed", current_step="probe", error_message=reason)
+    supabase.table("videos").update({"status": "rejected", "error_message": reason}).eq("id", video_id).execute()
+    publish_event("videos", video_id, status="rejected", error_message=reason)
+    workspace.mark_evictable(video_id)
+
+def _is_rejected(video_id: str) -> bool:
+    rows = supabase.table("videos").select("status").eq("id", video_id).execute().data
+    return bool(rows) and rows[0]["status"] == "rejected"
+
+def _too_long(media_info: Optional[dict]) -> Optional[str]:
+    if media_info and media_info.get("duration", 0) > settings.MAX_CLIP_SECONDS:
+        return f"Clip is {media_info['duration']:.0f}s long, the limit is {settings.MAX_CLIP_SECONDS}s"
+    return None
+
+def _download_raw(task, video_id: str, video_record: dict) -> str:
+    with workspace.task_dir(task.request.id) as scratch:
+        # Cached by shortcode: retries and re-processing don't download the reel again
+        downloaded = video_processor.download_reel(
+            video_record["instagram_url"], output_dir=scratch, shortcode=video_record.get("instagram_video_id")
+        )
+        return workspace.commit(downloaded, video_id, f"raw{os.path.splitext(downloaded)[1]}")
+
 @celery_app.task(bind=True, max_retries=3)
 def process_video(self, video_id: str):
+    """
+    Entry point for the processing pipeline. Builds and dispatches the staged workflow:
+
+        download | metadata   ->   transcode -> finalize -> publish
+
+    The AI calls (hook text and YouTube metadata, concurrently through AsyncAIService.analyze)
+    run alongside the download, so the hook is ready when transcode draws it. Each stage is routed
+    to its own queue (see celery_app.task_routes) so ffmpeg work and network calls of different
+    videos overlap instead of blocking each other.
+    """
     logger.info(f"Starting process for video {video_id}")
     try:
-        video_record = supabase.table("videos").select("*").eq("id", video_id).execute().data[0]
+        pipeline_job_id = _latest_pipeline_job_id(video_id)
+        if not pipeline_job_id:
+            return
         
-        jobs = supabase.table("pipeline_jobs").select("*").eq("video_id", video_id).order("created_at", desc=True).limit(1).execute()
-        if not jobs.data:
+        # Re-processing a video that was already probed: no need to build the workflow at all
+        video_record = supabase.table("videos").select("media_info").eq("id", video_id).execute().data
+        reason = _too_long(video_record[0].get("media_info")) if video_record else None
+        if reason:
+            _reject_video(video_id, reason)
             return
-        pipeline_job_id = jobs.data[0]["id"]
         
-        supabase.table("pipeline_jobs").update({"status": "running", "current_step": "download & hook"}).eq("id", pipeline_job_id).execute()
+        supabase.table("pipeline_jobs").update({"status": "running", "current_step": "download"}).eq("id", pipeline_job_id).execute()
         supabase.table("videos").update({"status": "processing"}).eq("id", video_id).execute()
+        publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, status="running", current_step="download")
+        publish_event("videos", video_id, status="processing")
         
-        # Determine paths
-        # NOTE: Using apps/api/temp to ensure write permissions in local dev if /tmp is restricted
-        # but the previous code used /tmp, let's stick to a robust path
-        temp_dir = os.path.join(os.getcwd(), "temp")
-        os.makedirs(os.path.join(temp_dir, "raw"), exist_ok=True)
-        os.makedirs(os.path.join(temp_dir, "processed"), exist_ok=True)
+        workflow = chord(
+            group(download_stage.si(video_id), metadata_stage.si(video_id)),
+            chain(transcode_stage.si(video_id), finalize_stage.si(video_id))
+        )
+        workflow.apply_async()
+    except Exception as e:
+        _fail_stage(self, video_id, "queue", e)
+
+@celery_app.task(bind=True, max_retries=3)
+def download_stage(self, video_id: str):
+    try:
+        workspace.admit()
+    except WorkspaceFull as e:
+        if self.request.retries < self.max_retries:
+            logger.warning(f"Workspace full, delaying download of {video_id}: {e}")
+            raise self.retry(exc=e, countdown=WORKSPACE_FULL_RETRY_SECONDS)
+        _fail_stage(self, video_id, "download", e)
+    try:
+        _resume_stage(self, video_id, "download")
+        video_record = supabase.table("videos").select("instagram_url", "instagram_video_id").eq("id", video_id).execute().data[0]
+        raw_path = _download_raw(self, video_id, video_record)
+        # Probed once here; later stages read it from the row instead of running ffprobe again
+        media_info = media_probe.info(raw_path, with_gop=True)
+        supabase.table("videos").update({"original_file_path": raw_path, "media_info": media_info}).eq("id", video_id).execute()
+        reason = _too_long(media_info)
+        if reason:
+            _reject_video(video_id, reason)
+            return None
+        return raw_path
+    except Exception as e:
+        _fail_stage(self, video_id, "download", e)
+
+@celery_app.task(bind=True, max_retries=3)
+def transcode_stage(self, video_id: str):
+    try:
+        if _is_rejected(video_id):
+            return None
+        _resume_stage(self, video_id, "hook")
+        pipeline_job_id = _latest_pipeline_job_id(video_id)
+        if pipeline_job_id:
+            supabase.table("pipeline_jobs").update({"current_step": "hook"}).eq("id", pipeline_job_id).execute()
+            publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, current_step="hook")
         
-        raw_path = video_processor.download_reel(video_record["instagram_url"], output_dir=os.path.join(temp_dir, "raw"))
-        processed_path = os.path.join(temp_dir, "processed", f"{video_id}.mp4")
+        video_record = supabase.table("videos").select(
+            "instagram_url", "instagram_video_id", "original_file_path", "media_info", "hook_text"
+        ).eq("id", video_id).execute().data[0]
+        raw_path = video_record["original_file_path"]
+        if not raw_path or not os.path.exists(raw_path):
+            # The download ran on another worker box (or was evicted), fetch our own copy
+            workspace.admit()
+            raw_path = _download_raw(self, video_id, video_record)
+        if video_record.get("media_info"):
+            # Ignored if this copy differs from the one that was probed
+            media_probe.remember(raw_path, video_record["media_info"])
         
         from routers.settings import load_settings
         
@@ -110,52 +309,84 @@ def process_video(self, video_id: str):
         hook_mode = user_config.get("hook_mode", "ai_text")
         
         intro_to_use = None
-        hook_text = ""
+        target_url = None
+        # Written by metadata_stage in ai_text mode
+        hook_text = video_record.get("hook_text") or ""
         
         if hook_mode == "single_video":
             target_url = user_config.get("selected_hook_url")
         elif hook_mode == "random_video":
-            filesRes = supabase.storage.from_("hooks").list()
-            valid_files = [f for f in filesRes if f["name"].endswith(".mp4")]
-            if valid_files:
-                random_file = random.choice(valid_files)
-                target_url = supabase.storage.from_("hooks").get_public_url(random_file["name"])
+            random_hook = hook_catalog.random()
+            if random_hook:
+                target_url = random_hook["url"]
         
         if target_url:
-            intro_tmp_path = os.path.join(temp_dir, "raw", f"intro_{uuid.uuid4().hex[:8]}.mp4")
-            urllib.request.urlretrieve(target_url, intro_tmp_path)
-            intro_to_use = intro_tmp_path
-        
-        video_processor.inject_hook(raw_path, processed_path, hook_text, intro_mp4_path=intro_to_use)
+            # Cached, already scaled/cropped to this video's format after the first use
+            intro_to_use = hook_cache.get_variant(target_url, video_processor.get_stream_profile(raw_path))
         
-        if intro_to_use and os.path.exists(intro_to_use):
-            os.remove(intro_to_use)
+        with workspace.task_dir(self.request.id) as scratch:
+            encoded_path = video_processor.inject_hook(
+                raw_path, os.path.join(scratch, "processed.mp4"), hook_text,
+                intro_mp4_path=intro_to_use, intro_normalized=True,
+                encode_profile=user_config.get("encode_profile")
+            )
+            processed_path = workspace.commit(encoded_path, video_id, "processed.mp4")
         
-        # 3. Metadata
-        metadata = ai.generate_youtube_metadata(video_record["instagram_caption"])
-        
-        # Update video record
         supabase.table("videos").update({
-            "status": "ready",
             "original_file_path": raw_path,
-            "processed_file_path": processed_path,
-            "hook_text": hook_text,
-            "yt_title": metadata.get("title", ""),
-            "yt_description": metadata.get("description", "")
+            "processed_file_path": processed_path
         }).eq("id", video_id).execute()
+        return processed_path
+    except Exception as e:
+        _fail_stage(self, video_id, "hook", e)
+
+@celery_app.task(bind=True, max_retries=3)
+def metadata_stage(self, video_id: str):
+    try:
+        video_record = supabase.table("videos").select("instagram_caption", "status").eq("id", video_id).execute().data[0]
+        if video_record["status"] == "rejected":
+            # Only catches rejections that landed first: this branch runs alongside the download
+            return None
+        _resume_stage(self, video_id, "metadata")
+        
+        from routers.settings import load_settings
         
-        supabase.table("pipeline_jobs").update({"status": "completed", "current_step": "ready"}).eq("id", pipeline_job_id).execute()
+        # Only the text overlay needs an AI hook; intro videos bring their own
+        needs_hook = load_settings().get("hook_mode", "ai_text") == "ai_text"
+        analysis = async_ai.run_sync(async_ai.analyze(
+            video_record["instagram_caption"], score=False, hook=needs_hook, metadata=True
+        ))
+        metadata = analysis["metadata"]
+        updates = {
+            "yt_title": metadata.get("title", ""),
+            "yt_description": metadata.get("description", "")
+        }
+        if needs_hook:
+            updates["hook_text"] = analysis["hook"]
+        supabase.table("videos").update(updates).eq("id", video_id).execute()
+        return metadata
+    except Exception as e:
+        _fail_stage(self, video_id, "metadata", e)
+
+@celery_app.task(bind=True, max_retries=3)
+def finalize_stage(self, video_id: str):
+    """End of the chord callback chain: runs once download, metadata and transcode have succeeded."""
+    try:
+        if _is_rejected(video_id):
+            return
+        supabase.table("videos").update({"status": "ready"}).eq("id", video_id).execute()
+        publish_event("videos", video_id, status="ready")
         
-        # --- AUTO PUBLISH ---
-        from tasks.youtube import publish_video
-        publish_video.delay(video_id)
+        pipeline_job_id = _latest_pipeline_job_id(video_id)
+        if pipeline_job_id:
+            supabase.table("pipeline_jobs").update({"status": "completed", "current_step": "ready"}).eq("id", pipeline_job_id).execute()
+            publish_event("pipeline_jobs", pipeline_job_id, video_id=video_id, status="completed", current_step="ready")
         
+        # --- AUTO PUBLISH --- (into the next free slot of the publish window)
+        from tasks.youtube import schedule_publishes
+        schedule_publishes.delay()
     except Exception as e:
-        logger.error(f"Processing failed: {e}")
-        if 'pipeline_job_id' in locals():
-            supabase.table("pipeline_jobs").update({"status": "failed", "error_message": str(e)}).eq("id", pipeline_job_id).execute()
-        supabase.table("videos").update({"status": "error", "error_message": str(e)}).eq("id", video_id).execute()
-        raise self.retry(exc=e)
+        _fail_stage(self, video_id, "publish", e)
 
 @celery_app.task(bind=True)
 def daily_smart_scraper(self):
@@ -177,23 +408,39 @@ def daily_smart_scraper(self):
         highest_views = -1
         source_account = ""
         
-        for account in accounts.data:
-            username = account["username"]
-            try:
-                # Scrape minimal text-only metadata (fast and low-bandwidth)
-                reels = scraper.get_recent_reels(username, limit=10)
-                for reel in reels:
-                    # Check if already processed
-                    existing = supabase.table("videos").select("id").eq("instagram_video_id", reel["id"]).execute()
-                    if existing.data:
-                        continue
-                        
-                    if reel["views"] > highest_views:
-                        highest_views = reel["views"]
-                        best_reel = reel
-                        source_account = username
-            except Exception as e:
-                logger.error(f"Error scraping {username} during daily run: {e}")
+        # Scrape minimal text-only metadata (fast and low-bandwidth) for all accounts in parallel,
+        # only walking posts newer than each account's stored cursor
+        accounts_by_name = {account["username"]: account for account in accounts.data}
+        cursors = {
+            username: {
+                "profile_id": account.get("instagram_profile_id"),
+                "shortcode": account.get("last_seen_shortcode"),
+                "taken_at": account.get("last_seen_post_at")
+            }
+            for username, account in accounts_by_name.items()
+        }
+        results = scrape_accounts(list(accounts_by_name), limit=10, cursors=cursors)
+        
+        candidates = []
+        scraped = {}
+        for username, result in results.items():
+            if isinstance(result, Exception):
+                logger.error(f"Error scraping {username} during daily run: {result}")
+                continue
+            reels, cursor = result
+            logger.info(f"{username}: {len(reels)} new reels since last scrape")
+            candidates.extend((reel, username) for reel in reels)
+            scraped[username] = (reels, cursor)
+        
+        # Check every scraped reel against already processed videos in a single lookup
+        new_ids = shortcode_index.filter_new(reel["id"] for reel, _ in candidates)
+        for reel, username in candidates:
+            if reel["id"] not in new_ids:
+                continue
+            if reel["views"] > highest_views:
+                highest_views = reel["views"]
+                best_reel = reel
+                source_account = username
                 
         if best_reel:
             logger.info(f"Daily Winner selected: {best_reel['id']} from {source_account} with {highest_views} views.")
@@ -204,6 +451,7 @@ def daily_smart_scraper(self):
                 "status": "completed",
                 "videos_found": 1
             }).execute()
+            publish_event("scrape_jobs", job_res.data[0]["id"], status="completed", videos_found=1)
             
             # Insert Video
             video_res = supabase.table("videos").insert({
@@ -214,23 +462,36 @@ def daily_smart_scraper(self):
                 "ai_score": 10,  # Max score by definition since we selected by views
                 "status": "discovered"
             }).execute()
+            shortcode_index.add(best_reel["id"])
             
             vid_id = video_res.data[0]["id"]
+            publish_event("videos", vid_id, status="discovered")
             
             # We delay the process task by a random amount calculated by the AI schedule strategy
             # For robustness, we will create a helper in youtube.py to determine upload times
             # Alternatively, we just queue it now and the publisher itself will wait.
             
-            supabase.table("pipeline_jobs").insert({
+            pipeline_res = supabase.table("pipeline_jobs").insert({
                 "video_id": vid_id,
                 "status": "pending",
                 "current_step": "download"
             }).execute()
+            publish_event("pipeline_jobs", pipeline_res.data[0]["id"], video_id=vid_id, status="pending", current_step="download")
             
             # Trigger heavy processing
             process_video.delay(vid_id)
         else:
             logger.info("No new viral videos found across any monitored accounts today.")
+        
+        # Advance cursors only past reels this run persisted (or that were already stored), so a crash
+        # or losing today's selection leaves the remaining candidates for the next run
+        pending = new_ids - {best_reel["id"]} if best_reel else new_ids
+        for username, (reels, cursor) in scraped.items():
+            try:
+                cursor = _cursor_after_persisted(reels, cursor, cursors[username], pending)
+                save_scrape_cursor(accounts_by_name[username]["id"], cursor)
+            except Exception as e:
+                logger.error(f"Failed to save scrape cursor for {username}: {e}")
             
     except Exception as e:
         logger.error(f"Daily Scrape failed: {e}")
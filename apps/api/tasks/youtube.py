@@ -1,14 +1,51 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
 from celery_app import celery_app
 from supabase_client import supabase
 from services.youtube import YouTubeService
+from services.youtube_quota import quota_ledger, QUOTA_COSTS
+from services.publish_scheduler import upcoming_slots, plan_slots
+from services.events import publish_event
+from services.workspace import workspace
+from services.metrics import timed, UPLOAD_SECONDS, UPLOAD_BYTES
+from config import settings
 
 logger = logging.getLogger(__name__)
+
+# Videos schedule_publishes may (re)assign a slot to
+PLANNABLE_STATUSES = ["ready", "scheduled", "deferred_quota"]
 yt_service = YouTubeService()
 
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
 @celery_app.task(bind=True, max_retries=3)
-def publish_video(self, video_id: str):
+def publish_video(self, video_id: str, slot: Optional[str] = None, deferred: bool = False):
     logger.info(f"Publishing video {video_id} to YouTube")
+    if deferred and not self.request.retries:
+        # Quota deferrals are re-planned by schedule_publishes now; this only serves eta messages
+        # queued before that, claimed so only one delivery gets to upload
+        claimed = supabase.table("videos").update({"status": "publishing"}).eq("id", video_id)\
+            .eq("status", "deferred_quota").execute()
+        if not claimed.data:
+            logger.info(f"Deferred publish of {video_id} already claimed, skipping")
+            return
+        publish_event("videos", video_id, status="publishing")
+    if slot and not self.request.retries:
+        # Claim the slot: a no-op if the scheduler moved the video since this task was queued
+        # (or a duplicate delivery already claimed it)
+        claimed = supabase.table("videos").update({"status": "publishing"}).eq("id", video_id)\
+            .eq("status", "scheduled").eq("scheduled_publish_at", slot).execute()
+        if not claimed.data:
+            logger.info(f"Publish slot {slot} for {video_id} is stale, skipping")
+            return
+        publish_event("videos", video_id, status="publishing")
+    # (channel id, quota day) of the insert units this attempt reserved, until YouTube has seen the upload
+    reservation = None
     try:
         video_record = supabase.table("videos").select("*").eq("id", video_id).execute().data[0]
         
@@ -16,31 +53,64 @@ def publish_video(self, video_id: str):
         if not channels.data:
             logger.error("No YouTube channel connected.")
             supabase.table("videos").update({"status": "failed", "error_message": "No YouTube channel"}).eq("id", video_id).execute()
+            publish_event("videos", video_id, status="failed", error_message="No YouTube channel")
             return
             
-        channel = channels.data[0]
+        channels_by_id = {channel["id"]: channel for channel in channels.data}
         
-        # In a real app the client ID and secret are passed to the Credential object, but the google auth lib handles
-        # it mostly through the from_client_config unless manually instantiated.
-        # So we supply it here from config.
-        from config import settings
-        creds = {
-            "token": channel["access_token"],
-            "refresh_token": channel["refresh_token"],
-            "token_uri": "https://oauth2.googleapis.com/token",
-            "client_id": settings.YOUTUBE_CLIENT_ID,
-            "client_secret": settings.YOUTUBE_CLIENT_SECRET,
-            "scopes": ["https://www.googleapis.com/auth/youtube.upload"]
-        }
+        # A previous attempt may have left a resumable session behind, continue it instead of restarting
+        jobs = supabase.table("pipeline_jobs").select("id", "upload_session_uri", "upload_channel_id").eq("video_id", video_id).order("created_at", desc=True).limit(1).execute()
+        pipeline_job = jobs.data[0] if jobs.data else None
+        
+        session_uri = None
+        if pipeline_job and pipeline_job.get("upload_session_uri") and pipeline_job.get("upload_channel_id") in channels_by_id:
+            # The session belongs to one channel and its insert quota was reserved when it started
+            channel = channels_by_id[pipeline_job["upload_channel_id"]]
+            session_uri = pipeline_job["upload_session_uri"]
+        else:
+            # Route to the connected channel with the most quota left today
+            channel = quota_ledger.pick_channel(channels.data, QUOTA_COSTS["videos.insert"])
+            if channel is not None:
+                reservation = (channel["id"], quota_ledger.quota_day())
+        
+        if channel is None:
+            # Back to the planner: it only hands out slots after the quota reset while no channel can pay
+            logger.warning(f"No channel has quota left for {video_id}, deferring publish to the next publish window")
+            supabase.table("videos").update({"status": "deferred_quota", "scheduled_publish_at": None}).eq("id", video_id).execute()
+            publish_event("videos", video_id, status="deferred_quota", scheduled_publish_at=None)
+            schedule_publishes.delay()
+            return
+        
+        def save_progress(session_uri: str, offset: int, total: int):
+            nonlocal reservation
+            if not pipeline_job:
+                return
+            progress = int(offset * 100 / total) if total else 100
+            supabase.table("pipeline_jobs").update({
+                "current_step": "uploading",
+                "upload_session_uri": session_uri,
+                "upload_channel_id": channel["id"],
+                "upload_offset": offset,
+                "upload_total_bytes": total,
+                "upload_progress": progress
+            }).eq("id", pipeline_job["id"]).execute()
+            publish_event("pipeline_jobs", pipeline_job["id"], video_id=video_id, current_step="uploading", upload_progress=progress)
+            # A retry resumes this session on the same channel without reserving again
+            reservation = None
         
         try:
-            response = yt_service.upload_video(
-                credentials_dict=creds,
-                file_path=video_record["processed_file_path"],
-                title=video_record["yt_title"],
-                description=video_record["yt_description"],
-                tags=video_record["yt_hashtags"] or []
-            )
+            with timed(UPLOAD_SECONDS):
+                response = yt_service.upload_video(
+                    channel=channel,
+                    file_path=video_record["processed_file_path"],
+                    title=video_record["yt_title"],
+                    description=video_record["yt_description"],
+                    tags=video_record["yt_hashtags"] or [],
+                    session_uri=session_uri,
+                    on_progress=save_progress
+                )
+            reservation = None
+            UPLOAD_BYTES.inc(os.path.getsize(video_record["processed_file_path"]))
             
             vid_url = f"https://youtube.com/shorts/{response['id']}" if response else ""
             
@@ -49,25 +119,150 @@ def publish_video(self, video_id: str):
                 "youtube_video_url": vid_url
             }).eq("id", video_id).execute()
             
-            supabase.table("pipeline_jobs").update({"status": "completed", "current_step": "published"}).eq("video_id", video_id).execute()
+            supabase.table("pipeline_jobs").update({"status": "completed", "current_step": "published", "upload_session_uri": None}).eq("video_id", video_id).execute()
+            publish_event("videos", video_id, status="published", youtube_video_url=vid_url)
+            # The raw and encoded files are only kept until space is needed
+            workspace.mark_evictable(video_id)
+            if pipeline_job:
+                publish_event("pipeline_jobs", pipeline_job["id"], video_id=video_id, status="completed", current_step="published", upload_progress=100)
             
         except Exception as e:
             if str(e) == "quotaExceeded":
-                logger.warning(f"YouTube Quota Exceeded for {video_id}, pausing video.")
-                supabase.table("videos").update({"status": "paused_quota"}).eq("id", video_id).execute()
+                # Our ledger missed usage on this channel: stop using it today and re-route the video
+                logger.warning(f"YouTube Quota Exceeded on channel {channel['id']} for {video_id}, re-routing.")
+                quota_ledger.mark_exhausted(channel["id"])
+                reservation = None
+                if pipeline_job:
+                    supabase.table("pipeline_jobs").update({"upload_session_uri": None, "upload_channel_id": None}).eq("id", pipeline_job["id"]).execute()
+                publish_video.delay(video_id)
                 return
             raise e
             
     except Exception as e:
         logger.error(f"Failed to publish to YouTube: {e}")
+        if reservation:
+            # Failed before any chunk reached YouTube (token refresh, missing file, session creation)
+            quota_ledger.refund(reservation[0], QUOTA_COSTS["videos.insert"], reservation[1])
         supabase.table("videos").update({"status": "error", "error_message": str(e)}).eq("id", video_id).execute()
+        publish_event("videos", video_id, status="error", error_message=str(e))
         raise self.retry(exc=e)
 
 @celery_app.task
 def retry_paused_videos():
-    """Scheduled task for Celery beat to retry quota-paused videos at midnight PST"""
+    """
+    Scheduled task for Celery beat to retry quota-paused videos at midnight PST.
+    publish_video now hands quota-deferred videos back to schedule_publishes ('deferred_quota'), so
+    this only picks up videos paused before that.
+    """
     logger.info("Running scheduled retry for paused videos")
     paused_videos = supabase.table("videos").select("id").eq("status", "paused_quota").execute()
     for vid in paused_videos.data:
         supabase.table("videos").update({"status": "retrying"}).eq("id", vid["id"]).execute()
+        publish_event("videos", vid["id"], status="retrying")
         publish_video.delay(vid["id"])
+
+@celery_app.task
+def collect_youtube_analytics():
+    """
+    Periodic (and on-demand, see GET /api/youtube/analytics) snapshot of every connected channel.
+    Channels are fetched in parallel and the results stored in youtube_analytics_snapshots, which is
+    then pruned to ANALYTICS_RETENTION_DAYS.
+    """
+    channels = supabase.table("youtube_channels").select("*").execute().data
+    if not channels:
+        return 0
+
+    def fetch(channel):
+        try:
+            return channel, yt_service.get_channel_analytics(channel, limit=5)
+        except Exception as e:
+            logger.error(f"Failed to collect analytics for channel {channel['id']}: {e}")
+            return channel, None
+
+    with ThreadPoolExecutor(max_workers=len(channels)) as pool:
+        results = list(pool.map(fetch, channels))
+
+    rows = [
+        {
+            "channel_id": channel["id"],
+            "channel_name": stats["channel_name"],
+            "thumbnail": stats["thumbnail"],
+            "subscriber_count": int(stats["subscriber_count"]),
+            "view_count": int(stats["view_count"]),
+            "video_count": int(stats["video_count"]),
+            "recent_videos": stats["recent_videos"]
+        }
+        for channel, stats in results if stats
+    ]
+    if rows:
+        supabase.table("youtube_analytics_snapshots").insert(rows).execute()
+    logger.info(f"Stored analytics snapshots for {len(rows)}/{len(channels)} channels")
+
+    try:
+        pruned = supabase.rpc("prune_youtube_analytics_snapshots", {"p_keep_days": settings.ANALYTICS_RETENTION_DAYS}).execute().data
+        if pruned:
+            logger.info(f"Pruned {pruned} analytics snapshots older than {settings.ANALYTICS_RETENTION_DAYS} days")
+    except Exception as e:
+        logger.warning(f"Failed to prune analytics snapshots: {e}")
+    return len(rows)
+
+@celery_app.task
+def schedule_publishes():
+    """
+    Spread ready videos over the configured publish window.
+    Every run re-plans all videos that are ready, scheduled or deferred for quota but not yet
+    published: the best ranked (ai_score, then instagram_views) get the earliest upcoming slots.
+    Runs when a video becomes ready, when the publish window changes, when a publish is deferred and
+    periodically from beat. Moved videos get a new delayed publish_video task; the old one finds its
+    slot stale and does nothing. Rows are only rewritten while still in a plannable status, so a
+    video publish_video has claimed in the meantime is left alone.
+    """
+    from routers.settings import load_settings
+    
+    user_config = load_settings()
+    tz = ZoneInfo(settings.PUBLISH_TIMEZONE)
+    
+    # One slot per insert the connected channels can afford in a quota day
+    channels = supabase.table("youtube_channels").select("id").execute().data
+    slots_per_day = max(1, len(channels) * (settings.YOUTUBE_DAILY_QUOTA // QUOTA_COSTS["videos.insert"]))
+    start = datetime.now(timezone.utc)
+    remaining = quota_ledger.remaining([channel["id"] for channel in channels])
+    if remaining and max(remaining.values()) < QUOTA_COSTS["videos.insert"]:
+        # Nothing can be uploaded before the quota resets, so don't plan slots before it
+        start = max(start, quota_ledger.next_reset())
+    slots = upcoming_slots(
+        start,
+        user_config.get("publish_time_start", "09:00"),
+        user_config.get("publish_time_end", "21:00"),
+        slots_per_day,
+        tz
+    )
+    
+    videos = supabase.table("videos").select("id", "status", "ai_score", "instagram_views", "created_at", "scheduled_publish_at")\
+        .in_("status", PLANNABLE_STATUSES).execute().data
+    plan = plan_slots(videos, slots)
+    
+    for video in videos:
+        current = _parse_timestamp(video.get("scheduled_publish_at"))
+        slot = plan.get(video["id"])
+        if slot is None:
+            if video["status"] == "scheduled":
+                # Pre-empted by better videos, wait for a later run
+                reset = supabase.table("videos").update({"status": "ready", "scheduled_publish_at": None})\
+                    .eq("id", video["id"]).in_("status", PLANNABLE_STATUSES).execute()
+                if reset.data:
+                    publish_event("videos", video["id"], status="ready", scheduled_publish_at=None)
+            continue
+        if video["status"] == "scheduled" and current == slot:
+            continue
+        slot_iso = slot.astimezone(timezone.utc).isoformat()
+        moved = supabase.table("videos").update({"status": "scheduled", "scheduled_publish_at": slot_iso})\
+            .eq("id", video["id"]).in_("status", PLANNABLE_STATUSES).execute()
+        if not moved.data:
+            # Claimed by publish_video since it was read
+            continue
+        publish_event("videos", video["id"], status="scheduled", scheduled_publish_at=slot_iso)
+        publish_video.apply_async((video["id"],), kwargs={"slot": slot_iso}, eta=slot)
+        logger.info(f"Video {video['id']} scheduled for {slot.isoformat()}")
+    
+    return len(plan)
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("groq")
+
+import services.ai as ai
+from services.ai import AsyncAIService, _chunk_captions, _parse_batch_scores
+
+class FakeAsyncGroq:
+    """Counts requests in flight instead of calling the API."""
+    in_flight = 0
+    peak = 0
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        cls = type(self)
+        cls.in_flight += 1
+        cls.peak = max(cls.peak, cls.in_flight)
+        await asyncio.sleep(0.02)
+        cls.in_flight -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=kwargs["model"]))])
+
+@pytest.fixture
+def service(monkeypatch):
+    FakeAsyncGroq.in_flight = FakeAsyncGroq.peak = 0
+    monkeypatch.setattr(ai, "AsyncGroq", FakeAsyncGroq)
+    return AsyncAIService(max_concurrency=2)
+
+def test_semaphore_bounds_requests_in_flight(service):
+    async def fan_out():
+        return await asyncio.gather(*(service._create(model=f"m{i}") for i in range(6)))
+
+    assert asyncio.run(fan_out()) == [f"m{i}" for i in range(6)]
+    assert FakeAsyncGroq.peak == 2
+
+def test_run_sync_works_from_worker_threads(service):
+    results = {}
+
+    def worker(i):
+        results[i] = service.run_sync(service._create(model=f"m{i}"))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == {i: f"m{i}" for i in range(4)}
+    assert FakeAsyncGroq.peak <= 2
+
+def test_chunks_respect_the_token_budget(monkeypatch):
+    monkeypatch.setattr(ai.settings, "GROQ_BATCH_TOKEN_BUDGET", 60)
+    captions = ["x" * 120, "y" * 120, "z" * 120]
+    # ~41 tokens per entry with overhead: one caption per chunk
+    assert _chunk_captions(captions, [0, 1, 2]) == [[0], [1], [2]]
+    assert _chunk_captions(["a", "b", "c"], [0, 2]) == [[0, 2]]
+
+def test_malformed_batch_entries_are_left_for_the_fallback():
+    content = '{"scores": [{"id": 0, "score": 140}, {"id": 1}, {"id": "two", "score": 5}, {"id": 7, "score": 50}, {"id": 2, "score": "40"}]}'
+    assert _parse_batch_scores(content, 3) == {0: 100, 2: 40}
+
+@pytest.fixture
+def isolated_cache(monkeypatch, tmp_path):
+    from services.llm_cache import LLMCache, SQLiteCacheBackend
+
+    cache = LLMCache(SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), max_entries=100), ttl=60)
+    monkeypatch.setattr(ai, "llm_cache", cache)
+    yield cache
+    cache.backend.close()
+
+def test_batch_scores_are_not_cached_as_single_caption_answers(service, monkeypatch, isolated_cache):
+    cache = isolated_cache
+    calls = []
+
+    async def fake_create(**kwargs):
+        calls.append(kwargs)
+        return '{"scores": [{"id": 0, "score": 70}, {"id": 1, "score": 20}]}'
+
+    monkeypatch.setattr(service, "_create", fake_create)
+    assert service.run_sync(service.score_videos(["first", "second"])) == [70, 20]
+    assert cache.get(ai._score_key("first")) is None
+    # The same chunk again is answered from the batch entry
+    assert service.run_sync(service.score_videos(["first", "second"])) == [70, 20]
+    assert len(calls) == 1
+
+def test_entries_missing_from_the_batch_are_scored_individually(service, monkeypatch, isolated_cache):
+    singles = []
+
+    async def fake_create(**kwargs):
+        user_prompt = kwargs["messages"][1]["content"]
+        if kwargs["messages"][0]["content"] == ai.BATCH_SCORE_SYSTEM_PROMPT:
+            return '{"scores": [{"id": 0, "score": 70}, {"id": 2, "score": "oops"}]}'
+        singles.append(user_prompt)
+        return "55"
+
+    monkeypatch.setattr(service, "_create", fake_create)
+    assert service.run_sync(service.score_videos(["first", "second", "third"])) == [70, 55, 55]
+    assert sorted(singles) == ["second", "third"]
+
+def test_failed_batch_falls_back_to_single_scoring(service, monkeypatch, isolated_cache):
+    async def failing_batch(captions):
+        raise RuntimeError("batch rejected")
+
+    async def fake_create(**kwargs):
+        return str(len(kwargs["messages"][1]["content"]))
+
+    monkeypatch.setattr(service, "_score_batch", failing_batch)
+    monkeypatch.setattr(service, "_create", fake_create)
+    assert service.run_sync(service.score_videos(["a", "bb", "ccc"])) == [1, 2, 3]
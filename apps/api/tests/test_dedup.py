@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+import pytest
+
+class FakeVideosTable:
+    """Serves `instagram_video_id` rows and records which queries were made."""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.queries = []
+        self._filter = None
+
+    def table(self, name):
+        return self
+
+    def select(self, *columns):
+        self._filter = None
+        return self
+
+    def range(self, start, end):
+        self._filter = ("range", start, end)
+        return self
+
+    def in_(self, column, values):
+        self._filter = ("in", sorted(values))
+        return self
+
+    def execute(self):
+        self.queries.append(self._filter)
+        if self._filter[0] == "range":
+            rows = self.ids[self._filter[1]:self._filter[2] + 1]
+        else:
+            rows = [code for code in self.ids if code in self._filter[1]]
+        return SimpleNamespace(data=[{"instagram_video_id": code} for code in rows])
+
+@pytest.fixture
+def dedup(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "SUPABASE_URL", settings.SUPABASE_URL or "http://localhost:54321")
+    monkeypatch.setattr(settings, "SUPABASE_SERVICE_ROLE_KEY", settings.SUPABASE_SERVICE_ROLE_KEY or "test")
+    import services.dedup as dedup
+    return dedup
+
+def test_warm_index_only_confirms_unknown_ids(dedup, monkeypatch):
+    table = FakeVideosTable(["a", "b", "c"])
+    monkeypatch.setattr(dedup, "supabase", table)
+    monkeypatch.setattr(dedup.ShortcodeIndex, "PAGE_SIZE", 2)
+    index = dedup.ShortcodeIndex()
+    index.warm()
+    assert table.queries == [("range", 0, 1), ("range", 2, 3)]
+
+    # Inserted by another worker after the warm-up
+    table.ids.append("d")
+    assert index.filter_new(["a", "d", "e"]) == {"e"}
+    assert table.queries[-1] == ("in", ["d", "e"])
+    assert "d" in index
+
+    table.queries.clear()
+    assert index.filter_new(["a", "b", "d"]) == set()
+    assert table.queries == []
+
+def test_cold_index_falls_back_to_one_lookup_per_batch(dedup, monkeypatch):
+    table = FakeVideosTable(["a"])
+
+    def failing_warm():
+        raise ConnectionError("supabase unavailable")
+
+    monkeypatch.setattr(dedup, "supabase", table)
+    index = dedup.ShortcodeIndex()
+    monkeypatch.setattr(index, "warm", failing_warm)
+    assert index.filter_new(["a", "b"]) == {"b"}
+    assert table.queries == [("in", ["a", "b"])]
+    assert "a" in index and "b" not in index
@@ -0,0 +1,51 @@
+import os
+import pytest
+
+pytest.importorskip("yt_dlp")
+pytest.importorskip("pydantic_settings")
+
+from services.downloads import choose_format
+
+VIDEO_720 = {"format_id": "v720", "ext": "mp4", "vcodec": "avc1", "acodec": "none", "height": 1280, "fps": 30}
+VIDEO_1080 = {"format_id": "v1080", "ext": "mp4", "vcodec": "avc1", "acodec": "none", "height": 1920, "fps": 30}
+AUDIO = {"format_id": "a", "ext": "m4a", "vcodec": "none", "acodec": "mp4a", "abr": 128}
+PROGRESSIVE_720 = {"format_id": "p720", "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a", "height": 1280, "fps": 30}
+
+def test_progressive_wins_at_equal_quality():
+    assert choose_format([VIDEO_720, AUDIO, PROGRESSIVE_720]) == "p720"
+
+def test_separate_streams_when_they_are_better():
+    assert choose_format([VIDEO_1080, AUDIO, PROGRESSIVE_720]) == "v1080+a"
+
+def test_progressive_only():
+    assert choose_format([PROGRESSIVE_720]) == "p720"
+
+def test_unknown_formats_fall_back_to_yt_dlp_selection():
+    assert choose_format([{"format_id": "x", "ext": "webm", "vcodec": "vp9", "acodec": "opus"}]) == "best[ext=mp4]/best"
+
+def test_evicting_a_cached_download_frees_its_bytes(tmp_path, monkeypatch):
+    from services.downloads import ReelDownloader
+    from services.workspace import Workspace
+
+    downloader = ReelDownloader(str(tmp_path / "cache"), max_bytes=10 ** 9, concurrent_fragments=1)
+    workspace = Workspace(str(tmp_path / "workspace"), max_bytes=0, min_free_bytes=0)
+    workspace.register_cache(downloader)
+
+    def fake_download(url, output_dir, name):
+        path = os.path.join(output_dir, f"{name}.mp4")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 4096)
+        return {"path": path, "bytes": 4096, "seconds": 0.1, "cached": False, "format": "p720"}
+
+    monkeypatch.setattr(downloader, "_download", fake_download)
+    with workspace.task_dir("task-1") as scratch:
+        result = downloader.fetch("https://www.instagram.com/reel/abc/", scratch, shortcode="abc")
+        raw_path = workspace.commit(result["path"], "video-1", "raw.mp4")
+
+    # The workspace copy shares no inode with the cache, so removing it really frees disk
+    assert os.stat(raw_path).st_nlink == 1
+    assert os.stat(tmp_path / "cache" / "abc.mp4").st_nlink == 1
+    workspace.mark_evictable("video-1")
+    assert not os.path.exists(raw_path)
+    assert not os.path.exists(tmp_path / "cache" / "abc.mp4")
+    assert workspace.usage() == 0
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from services.events import EventBroadcaster
+
+def test_local_events_reach_subscribers_from_worker_threads():
+    broadcaster = EventBroadcaster("local", "")
+
+    async def run():
+        with broadcaster.subscribe() as queue:
+            publisher = threading.Thread(target=broadcaster.publish, args=("pipeline_jobs", "job-1"), kwargs={"upload_progress": 40})
+            publisher.start()
+            event = await asyncio.wait_for(queue.get(), timeout=2)
+            publisher.join()
+        return event
+
+    event = asyncio.run(run())
+    assert event["table"] == "pipeline_jobs" and event["id"] == "job-1" and event["upload_progress"] == 40
+    assert not broadcaster._subscribers
+
+def test_publish_without_subscribers_is_a_no_op():
+    EventBroadcaster("local", "").publish("videos", "video-1", status="ready")
+
+class _FakePubSub:
+    def __init__(self):
+        self.closed = False
+
+    async def subscribe(self, channel):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        await asyncio.sleep(0.01)
+        return None
+
+    async def aclose(self):
+        self.closed = True
+
+class _FakeRedis:
+    def __init__(self):
+        self.pubsubs = []
+        self.closed = False
+
+    def pubsub(self):
+        self.pubsubs.append(_FakePubSub())
+        return self.pubsubs[-1]
+
+    async def aclose(self):
+        self.closed = True
+
+def test_redis_pump_stops_and_closes_after_last_subscriber(monkeypatch):
+    import sys
+    import types
+
+    clients = []
+    fake = types.ModuleType("redis.asyncio")
+    fake.from_url = lambda url: clients.append(_FakeRedis()) or clients[-1]
+    monkeypatch.setitem(sys.modules, "redis", types.ModuleType("redis"))
+    monkeypatch.setitem(sys.modules, "redis.asyncio", fake)
+    broadcaster = EventBroadcaster("redis", "redis://test")
+
+    async def run():
+        with broadcaster.subscribe():
+            await asyncio.sleep(0.05)
+        await asyncio.wait_for(broadcaster._pump, timeout=2)
+
+    asyncio.run(run())
+    assert len(clients) == 1 and clients[0].closed and clients[0].pubsubs[0].closed
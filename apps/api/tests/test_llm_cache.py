@@ -0,0 +1,40 @@
+import threading
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from services.llm_cache import LLMCache, SQLiteCacheBackend
+
+def test_sqlite_backend_reuses_one_connection_per_thread(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), max_entries=10)
+    backend.set("k", "v", ttl=60)
+    assert backend.get("k") == "v"
+    assert backend._connect() is backend._connect()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append((backend._connect(), backend.get("k"))))
+    thread.start()
+    thread.join()
+    assert other[0][0] is not backend._connect() and other[0][1] == "v"
+    backend.close()
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in ("a", "b", "c"):
+        backend.set(key, key, ttl=60)
+    assert backend.get("a") is None and backend.get("c") == "c"
+    backend.close()
+
+def test_lookups_are_counted_as_hits_and_misses(tmp_path):
+    prometheus_client = pytest.importorskip("prometheus_client")
+    cache = LLMCache(SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), max_entries=10), ttl=60)
+
+    def count(result):
+        return prometheus_client.REGISTRY.get_sample_value("reelflow_llm_cache_requests_total", {"result": result}) or 0
+
+    hits, misses = count("hit"), count("miss")
+    cache.get("missing")
+    cache.set("present", "1")
+    cache.get("present")
+    assert (count("hit") - hits, count("miss") - misses) == (1, 1)
+    cache.backend.close()
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("ffmpeg")
+
+from services import media_probe as media_probe_module
+from services.media_probe import MediaProbe
+
+PROBE = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 720, "height": 1280, "r_frame_rate": "30/1",
+         "avg_frame_rate": "30000/1001", "pix_fmt": "yuv420p", "profile": "High"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channel_layout": "stereo"}
+    ],
+    "format": {"duration": "12.5", "bit_rate": "2500000", "size": "4"}
+}
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    def fake_probe(path, **kwargs):
+        calls.append(kwargs)
+        return PROBE
+    monkeypatch.setattr(media_probe_module.ffmpeg, "probe", fake_probe)
+    return calls
+
+def test_probe_runs_once_per_file_version(tmp_path, calls):
+    path = tmp_path / "raw.mp4"
+    path.write_bytes(b"abcd")
+    probe = MediaProbe()
+
+    info = probe.info(str(path))
+    assert info["fps_value"] == 29.97 and info["profile"] == "high" and info["bitrate_kbps"] == 2500
+    probe.info(str(path))
+    assert len(calls) == 1
+
+    path.write_bytes(b"abcdef")
+    probe.info(str(path))
+    assert len(calls) == 2
+
+def test_remember_only_matches_the_probed_file(tmp_path, calls):
+    path = tmp_path / "raw.mp4"
+    path.write_bytes(b"abcd")
+    probe = MediaProbe()
+
+    assert not probe.remember(str(path), {"size_bytes": 99, "duration": 1.0})
+    assert probe.remember(str(path), {"size_bytes": 4, "duration": 7.0})
+    assert probe.info(str(path))["duration"] == 7.0
+    assert not calls
+
+def test_keyframes_are_listed_relative_to_the_stream_start(tmp_path, monkeypatch):
+    def fake_probe(path, **kwargs):
+        if "show_entries" in kwargs:
+            return {"streams": [{"start_time": "1.5"}], "packets": [
+                {"pts_time": "1.5", "flags": "K_"}, {"pts_time": "1.533", "flags": "__"},
+                {"pts_time": "3.5", "flags": "K_"}, {"pts_time": "5.5", "flags": "K_"}
+            ]}
+        return PROBE
+    monkeypatch.setattr(media_probe_module.ffmpeg, "probe", fake_probe)
+    path = tmp_path / "raw.mp4"
+    path.write_bytes(b"abcd")
+
+    info = MediaProbe().info(str(path), with_gop=True)
+    assert info["keyframes"] == [0.0, 2.0, 4.0] and info["gop_seconds"] == 2.0
+
+def test_smart_render_cut_comes_from_stored_keyframes(tmp_path, calls):
+    pytest.importorskip("yt_dlp")
+    from services.video import VideoProcessor
+
+    path = tmp_path / "raw.mp4"
+    path.write_bytes(b"abcd")
+    media_probe_module.media_probe.remember(str(path), {"size_bytes": 4, "duration": 12.5, "keyframes": [0.0, 1.0, 2.5, 5.0]})
+    assert VideoProcessor()._first_keyframe_after(str(path), 2) == 2.5
+    assert not calls
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from prometheus_client import REGISTRY
+from services.metrics import SCRAPE_SECONDS, _supabase_target, llm_call, timed
+
+def _count(name, **labels):
+    return REGISTRY.get_sample_value(f"{name}_count", labels)
+
+def test_supabase_target_names_table_rpc_and_bucket():
+    assert _supabase_target("https://x.supabase.co/rest/v1/videos?select=id") == "videos"
+    assert _supabase_target("https://x.supabase.co/rest/v1/rpc/save_app_settings") == "rpc:save_app_settings"
+    assert _supabase_target("https://x.supabase.co/storage/v1/object/hooks/intro.mp4") == "storage:hooks"
+    assert _supabase_target("https://x.supabase.co/auth/v1/user") == "other"
+
+def test_timed_records_errors_under_their_own_outcome():
+    with pytest.raises(RuntimeError):
+        with timed(SCRAPE_SECONDS, account="test_timed"):
+            raise RuntimeError("blocked")
+    assert _count("reelflow_scrape_seconds", account="test_timed", outcome="error") == 1
+
+def test_llm_call_times_sync_and_async_methods():
+    import asyncio
+
+    @llm_call
+    def sync_method():
+        return 1
+
+    @llm_call
+    async def async_method():
+        return 2
+
+    assert sync_method() == 1
+    assert asyncio.run(async_method()) == 2
+    assert _count("reelflow_llm_seconds", method="sync_method", outcome="ok") == 1
+    assert _count("reelflow_llm_seconds", method="async_method", outcome="ok") == 1
+
+def test_instrument_supabase_hooks_postgrest_and_storage_sessions():
+    httpx = pytest.importorskip("httpx")
+    from types import SimpleNamespace
+    from services.metrics import instrument_supabase
+
+    def handler(request):
+        return httpx.Response(200)
+
+    postgrest = SimpleNamespace(session=httpx.Client(transport=httpx.MockTransport(handler)))
+    storage = SimpleNamespace(session=httpx.Client(transport=httpx.MockTransport(handler)))
+    instrument_supabase(SimpleNamespace(postgrest=postgrest, storage=storage))
+
+    postgrest.session.get("https://x.supabase.co/rest/v1/videos")
+    storage.session.post("https://x.supabase.co/storage/v1/object/hooks/intro.mp4")
+    assert _count("reelflow_supabase_seconds", table="videos", method="GET", status="200") == 1
+    assert _count("reelflow_supabase_seconds", table="storage:hooks", method="POST", status="200") == 1
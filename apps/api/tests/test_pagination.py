@@ -0,0 +1,52 @@
+import pytest
+from services.pagination import decode_cursor, encode_cursor, keyset_page, parse_columns
+
+ROW = {"created_at": "2026-04-26T10:00:00.123456+00:00", "id": "0b0f3e1c-1111-4a4a-8b8b-123456789abc"}
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+
+    def or_(self, expression):
+        self.filters.append(expression)
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    def execute(self):
+        return self
+
+    @property
+    def data(self):
+        return self.rows
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(ROW)) == (ROW["created_at"], ROW["id"])
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor({"created_at": "yesterday", "id": ROW["id"]}),
+                                    encode_cursor({"created_at": ROW["created_at"], "id": "1),id.gt.(0"})])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_columns_always_include_the_cursor_keys():
+    assert parse_columns("status", {"status", "id", "created_at"}, []) == ["id", "created_at", "status"]
+    with pytest.raises(ValueError):
+        parse_columns("status,access_token", {"status"}, [])
+
+def test_keyset_page_returns_next_cursor_only_when_more_rows_exist():
+    rows = [dict(ROW, id=f"0b0f3e1c-1111-4a4a-8b8b-12345678900{i}") for i in range(3)]
+    page, next_cursor = keyset_page(FakeQuery(rows), None, 2)
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor) == (rows[1]["created_at"], rows[1]["id"])
+
+    query = FakeQuery(rows[2:])
+    page, next_cursor = keyset_page(query, next_cursor, 2)
+    assert page == rows[2:] and next_cursor is None
+    assert query.filters and rows[1]["id"] in query.filters[0]
@@ -0,0 +1,29 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+from services.publish_scheduler import window_slots, upcoming_slots, plan_slots
+
+PT = ZoneInfo("America/Los_Angeles")
+
+def test_window_slots_are_evenly_spread():
+    slots = window_slots(date(2026, 4, 6), "09:00", "21:00", 4, PT)
+    assert [s.strftime("%H:%M") for s in slots] == ["10:30", "13:30", "16:30", "19:30"]
+
+def test_window_past_midnight():
+    slots = window_slots(date(2026, 4, 6), "22:00", "02:00", 2, PT)
+    assert [s.strftime("%d %H:%M") for s in slots] == ["06 23:00", "07 01:00"]
+
+def test_upcoming_slots_skip_past_ones():
+    now = datetime(2026, 4, 6, 14, 0, tzinfo=PT).astimezone(timezone.utc)
+    slots = upcoming_slots(now, "09:00", "21:00", 4, PT, days=2)
+    assert slots[0] == datetime(2026, 4, 6, 16, 30, tzinfo=PT)
+    assert len(slots) == 2 + 4
+
+def test_best_ranked_video_gets_earliest_slot():
+    slots = window_slots(date(2026, 4, 6), "09:00", "21:00", 2, PT)
+    videos = [
+        {"id": "low", "ai_score": 40, "instagram_views": 10},
+        {"id": "viral", "ai_score": 90, "instagram_views": 5},
+        {"id": "popular", "ai_score": 40, "instagram_views": 1000},
+    ]
+    plan = plan_slots(videos, slots)
+    assert plan == {"viral": slots[0], "popular": slots[1]}
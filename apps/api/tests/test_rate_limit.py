@@ -0,0 +1,18 @@
+import time
+from services.rate_limit import TokenBucket, limiter_for
+
+def test_token_bucket_allows_burst_then_blocks():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert all(bucket.try_acquire() for _ in range(3))
+    assert not bucket.try_acquire()
+
+def test_token_bucket_acquire_waits_for_refill():
+    bucket = TokenBucket(rate=50, capacity=1)
+    bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.015
+
+def test_limiter_is_shared_per_host():
+    assert limiter_for("example.com", 1, 1) is limiter_for("example.com", 5, 5)
+    assert limiter_for("example.com", 1, 1) is not limiter_for("example.org", 1, 1)
@@ -0,0 +1,89 @@
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("instaloader")
+
+from services.scraper import InstagramScraper
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "SUPABASE_URL", settings.SUPABASE_URL or "http://localhost:54321")
+    monkeypatch.setattr(settings, "SUPABASE_SERVICE_ROLE_KEY", settings.SUPABASE_SERVICE_ROLE_KEY or "test")
+    import tasks.pipeline as pipeline
+    return pipeline
+
+class FakeAccountsTable:
+    """Records update calls; the conditional update matches only when `matches` is set."""
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.updates = []
+
+    def table(self, name):
+        return self
+
+    def update(self, values):
+        self.updates.append({"values": values, "or": None})
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def or_(self, filters):
+        self.updates[-1]["or"] = filters
+        return self
+
+    def execute(self):
+        conditional = self.updates[-1]["or"] is not None
+        return SimpleNamespace(data=[{"id": "acc"}] if self.matches or not conditional else [])
+
+CURSOR = {"profile_id": 42, "shortcode": "new", "taken_at": "2026-05-02T10:00:00+00:00"}
+
+def test_cursor_moves_forward_with_one_conditional_update(pipeline, monkeypatch):
+    table = FakeAccountsTable(matches=True)
+    monkeypatch.setattr(pipeline, "supabase", table)
+    pipeline.save_scrape_cursor("acc", CURSOR)
+    assert len(table.updates) == 1
+    assert table.updates[0]["values"]["last_seen_shortcode"] == "new"
+    assert table.updates[0]["or"] == "last_seen_post_at.is.null,last_seen_post_at.lte.2026-05-02T10:00:00+00:00"
+
+def test_newer_stored_cursor_only_touches_last_scraped_at(pipeline, monkeypatch):
+    table = FakeAccountsTable(matches=False)
+    monkeypatch.setattr(pipeline, "supabase", table)
+    pipeline.save_scrape_cursor("acc", CURSOR)
+    assert len(table.updates) == 2
+    assert list(table.updates[1]["values"]) == ["last_scraped_at"]
+
+def _reel(shortcode, day):
+    return {"id": shortcode, "taken_at": f"2026-05-{day:02d}T00:00:00+00:00"}
+
+def test_cursor_stays_below_candidates_that_were_not_persisted(pipeline):
+    previous = {"profile_id": 42, "shortcode": "old", "taken_at": "2026-05-01T00:00:00+00:00"}
+    scraped = {"profile_id": 42, "shortcode": "d4", "taken_at": "2026-05-04T00:00:00+00:00"}
+    reels = [_reel("d4", 4), _reel("d3", 3), _reel("d2", 2)]
+
+    assert pipeline._cursor_after_persisted(reels, scraped, previous, pending=set()) == scraped
+    # d3 lost the daily selection: stop just after d2, which was already stored
+    assert pipeline._cursor_after_persisted(reels, scraped, previous, pending={"d3"}) == {
+        "profile_id": 42, "shortcode": "d2", "taken_at": "2026-05-02T00:00:00+00:00"
+    }
+    assert pipeline._cursor_after_persisted(reels, scraped, previous, pending={"d2", "d4"}) == previous
+
+def _post(shortcode, day, pinned=False):
+    return SimpleNamespace(
+        shortcode=shortcode, date_utc=datetime(2026, 5, day), is_pinned=pinned,
+        is_video=True, video_view_count=100, caption=shortcode
+    )
+
+def test_pinned_old_post_does_not_end_the_walk(monkeypatch):
+    posts = [_post("pinned", 1, pinned=True), _post("fresh", 5), _post("seen", 3), _post("older", 2)]
+    profile = SimpleNamespace(userid=42, get_posts=lambda: iter(posts))
+    scraper = InstagramScraper()
+    monkeypatch.setattr(scraper, "_load_profile", lambda username, profile_id=None: profile)
+
+    reels, cursor = scraper.get_new_reels("acct", cursor={"profile_id": 42, "shortcode": "seen", "taken_at": "2026-05-03T00:00:00+00:00"})
+    assert [reel["id"] for reel in reels] == ["fresh"]
+    assert cursor == {"profile_id": 42, "shortcode": "fresh", "taken_at": "2026-05-05T00:00:00+00:00"}
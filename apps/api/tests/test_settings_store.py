@@ -0,0 +1,73 @@
+import os
+from services.settings_store import DatabaseSettingsStore, FileSettingsStore
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Query:
+    def __init__(self, client, columns):
+        self.client, self.columns = client, columns
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        self.client.selects.append(self.columns)
+        return _Result([{"version": self.client.version, "data": self.client.data}])
+
+class FakeSettingsClient:
+    def __init__(self, data):
+        self.data, self.version, self.selects = data, 1, []
+
+    def table(self, name):
+        return self
+
+    def select(self, *columns):
+        return _Query(self, columns)
+
+def test_missing_file_loads_none(tmp_path):
+    assert FileSettingsStore(str(tmp_path / "user_settings.json")).load() is None
+
+def test_save_is_seen_by_another_store(tmp_path):
+    path = str(tmp_path / "data" / "user_settings.json")
+    api, worker = FileSettingsStore(path), FileSettingsStore(path)
+    api.save({"hook_mode": "single_video"})
+    assert worker.load() == {"hook_mode": "single_video"}
+
+    # Same size as before: the change is still picked up
+    api.save({"hook_mode": "random_video"})
+    assert worker.load() == {"hook_mode": "random_video"}
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.startswith(".settings-")]
+
+def test_load_is_cached_until_the_file_changes(tmp_path):
+    path = str(tmp_path / "user_settings.json")
+    store = FileSettingsStore(path)
+    store.save({"encode_profile": "fast"})
+    first = store.load()
+    first["encode_profile"] = "mutated"
+    assert store.load() == {"encode_profile": "fast"}
+
+def test_database_version_check_is_skipped_within_the_ttl(monkeypatch):
+    client = FakeSettingsClient({"hook_mode": "none"})
+    store = DatabaseSettingsStore(client, ttl=5)
+    now = [100.0]
+    monkeypatch.setattr("services.settings_store.time.monotonic", lambda: now[0])
+
+    assert store.load() == {"hook_mode": "none"}
+    assert len(client.selects) == 2  # version, then the row
+
+    # Another process saved: not seen until the TTL runs out
+    client.data, client.version = {"hook_mode": "ai_text"}, 2
+    assert store.load() == {"hook_mode": "none"}
+    assert len(client.selects) == 2
+
+    now[0] += 6
+    assert store.load() == {"hook_mode": "ai_text"}
+    assert len(client.selects) == 4
+
+    # Unchanged version after expiry: one cheap check, then cached again
+    now[0] += 6
+    assert store.load() == {"hook_mode": "ai_text"}
+    assert store.load() == {"hook_mode": "ai_text"}
+    assert client.selects[4:] == [("version",)]
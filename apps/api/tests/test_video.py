@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("ffmpeg")
+pytest.importorskip("yt_dlp")
+
+from services.encode_profiles import get_profile
+from services.video import smart_render_blocker
+
+MAIN = {
+    "vcodec": "h264", "width": 720, "height": 1280, "pix_fmt": "yuv420p", "profile": "high", "level": 31,
+    "fps": "30/1", "time_base": "1/15360", "acodec": "aac", "sample_rate": "44100", "channel_layout": "stereo"
+}
+
+def test_matching_h264_clip_and_intro_can_be_stream_copied():
+    assert smart_render_blocker(MAIN, get_profile("balanced")) is None
+    assert smart_render_blocker(MAIN, get_profile("balanced"), intro=dict(MAIN)) is None
+
+@pytest.mark.parametrize("changes", [{"level": 40}, {"fps": "25/1"}, {"time_base": "1/90000"}, {"profile": "main"}])
+def test_intro_with_a_different_stream_setup_falls_back(changes):
+    blocker = smart_render_blocker(MAIN, get_profile("balanced"), intro={**MAIN, **changes})
+    assert blocker and next(iter(changes)) in blocker
+
+@pytest.mark.parametrize("changes", [{"vcodec": "hevc"}, {"acodec": "opus"}, {"level": None}, {"time_base": None}])
+def test_unsupported_or_unknown_sources_fall_back(changes):
+    assert smart_render_blocker({**MAIN, **changes}, get_profile("balanced"))
+
+def test_rescaling_profile_falls_back():
+    assert smart_render_blocker(MAIN, get_profile("shorts_1080p")) == "the encode profile rescales"
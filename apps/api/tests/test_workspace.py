@@ -0,0 +1,70 @@
+import os
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from services.workspace import Workspace, WorkspaceFull
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+def test_task_dir_is_removed_even_on_failure(tmp_path):
+    workspace = Workspace(str(tmp_path), max_bytes=10 ** 9, min_free_bytes=0)
+    with pytest.raises(RuntimeError):
+        with workspace.task_dir("task-1") as scratch:
+            write(os.path.join(scratch, "partial.mp4"), 10)
+            raise RuntimeError("ffmpeg died")
+    assert not os.path.exists(scratch)
+
+def test_commit_moves_into_video_dir(tmp_path):
+    workspace = Workspace(str(tmp_path), max_bytes=10 ** 9, min_free_bytes=0)
+    with workspace.task_dir("task-1") as scratch:
+        write(os.path.join(scratch, "out.mp4"), 10)
+        final_path = workspace.commit(os.path.join(scratch, "out.mp4"), "video-1", "processed.mp4")
+    assert final_path == os.path.join(str(tmp_path), "video-1", "processed.mp4")
+    assert os.path.getsize(final_path) == 10
+
+def test_only_evictable_videos_are_evicted_oldest_first(tmp_path):
+    workspace = Workspace(str(tmp_path), max_bytes=250, min_free_bytes=0)
+    for i, video_id in enumerate(["old", "newer", "in-progress"]):
+        write(os.path.join(workspace.video_dir(video_id), "raw.mp4"), 100)
+        os.utime(os.path.join(str(tmp_path), video_id), (1000 + i, 1000 + i))
+    for video_id in ("old", "newer"):
+        open(os.path.join(str(tmp_path), video_id, ".evictable"), "a").close()
+        os.utime(os.path.join(str(tmp_path), video_id), (1000, 1000) if video_id == "old" else (1001, 1001))
+
+    workspace.evict()
+    assert sorted(os.listdir(str(tmp_path))) == ["in-progress", "newer"]
+
+def test_admit_raises_when_the_disk_cannot_be_freed(tmp_path):
+    workspace = Workspace(str(tmp_path), max_bytes=10 ** 12, min_free_bytes=10 ** 18)
+    with pytest.raises(WorkspaceFull):
+        workspace.admit()
+
+class FakeCache:
+    def __init__(self, size):
+        self.size = size
+
+    def usage(self):
+        return self.size
+
+    def shrink(self, bytes_to_free):
+        freed = min(bytes_to_free, self.size)
+        self.size -= freed
+        return freed
+
+def test_caches_count_against_the_budget_and_are_trimmed_after_videos(tmp_path):
+    workspace = Workspace(str(tmp_path), max_bytes=250, min_free_bytes=0)
+    cache = FakeCache(200)
+    workspace.register_cache(cache)
+    write(os.path.join(workspace.video_dir("published"), "raw.mp4"), 100)
+    open(os.path.join(str(tmp_path), "published", ".evictable"), "a").close()
+    assert workspace.usage() == 300
+
+    workspace.evict()
+    assert not os.path.exists(os.path.join(str(tmp_path), "published"))
+    assert cache.size == 200
+
+    workspace.evict(reserve_bytes=100)
+    assert cache.size == 150
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from services.youtube_upload import ResumableUploader, CHUNK_ALIGNMENT
+
+requests = pytest.importorskip("requests")
+
+class FakeUploadServer(HTTPServer):
+    """Minimal YouTube resumable upload endpoint that can drop the connection mid-upload."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeUploadHandler)
+        self.received = b""
+        self.total = None
+        self.fail_after_chunks = None
+        self.chunk_puts = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class FakeUploadHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.total = int(self.headers["X-Upload-Content-Length"])
+        self.send_response(200)
+        self.send_header("Location", f"{self.server.url}/session/1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if body:
+            self.server.chunk_puts += 1
+            if self.server.fail_after_chunks is not None and self.server.chunk_puts > self.server.fail_after_chunks:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start = int(self.headers["Content-Range"].split(" ")[1].split("-")[0])
+            assert start == len(self.server.received)
+            self.server.received += body
+        if len(self.server.received) >= self.server.total:
+            payload = json.dumps({"id": "fake123"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(308)
+        if self.server.received:
+            self.send_header("Range", f"bytes=0-{len(self.server.received) - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+@pytest.fixture
+def server():
+    srv = FakeUploadServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+
+def test_upload_resumes_from_last_acknowledged_chunk(server, tmp_path):
+    data = bytes(range(256)) * (CHUNK_ALIGNMENT * 3 // 256 + 7)
+    video = tmp_path / "video.mp4"
+    video.write_bytes(data)
+
+    progress = []
+    uploader = ResumableUploader(requests.Session(), upload_url=f"{server.url}/upload", chunk_size=CHUNK_ALIGNMENT)
+
+    server.fail_after_chunks = 2
+    with pytest.raises(Exception):
+        uploader.upload(str(video), {"snippet": {}}, part="snippet", on_progress=lambda *args: progress.append(args))
+    session_uri, offset, total = progress[-1]
+    assert offset == 2 * CHUNK_ALIGNMENT and total == len(data)
+
+    server.fail_after_chunks = None
+    response = uploader.upload(str(video), {"snippet": {}}, part="snippet", session_uri=session_uri)
+    assert response == {"id": "fake123"}
+    assert server.received == data
+    # Only the two chunks that failed or were never sent were uploaded again
+    assert server.chunk_puts == 5
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { supabase } from "@/lib/supabase";
+import { API_URL, fetchApi } from "@/lib/api";
 
 type Job = {
     id: string;
@@ -9,6 +9,7 @@ type Job = {
     status: string;
     current_step: string;
     error_message: string | null;
+    upload_progress?: number | null;
     created_at: string;
 };
 
@@ -17,32 +18,30 @@ export default function QueuePage() {
 
     useEffect(() => {
         const loadJobs = async () => {
-            const { data } = await supabase
-                .from("pipeline_jobs")
-                .select("*")
-                .order("created_at", { ascending: false });
-            if (data) setJobs(data);
+            const data = await fetchApi("/jobs/pipeline?limit=50");
+            if (data?.jobs) setJobs(data.jobs);
         };
 
         loadJobs();
 
-        const channel = supabase
-            .channel('schema-db-changes')
-            .on(
-                'postgres_changes',
-                {
-                    event: '*',
-                    schema: 'public',
-                    table: 'pipeline_jobs',
-                },
-                () => {
-                    loadJobs();
+        // Live updates pushed by the workers, patched into the loaded rows
+        const events = new EventSource(`${API_URL}/events/stream?tables=pipeline_jobs`);
+        events.addEventListener("pipeline_jobs", (message) => {
+            const event = JSON.parse((message as MessageEvent).data);
+            setJobs((current) => {
+                if (!current.some((job) => job.id === event.id)) {
+                    // A job outside the loaded page: only a creation event carries enough to show it
+                    if (!event.status || !event.current_step) return current;
+                    return [{ created_at: event.at, ...event } as Job, ...current];
                 }
-            )
-            .subscribe();
+                return current.map((job) => (job.id === event.id ? { ...job, ...event } : job));
+            });
+        });
+        // Missed events while disconnected: resync once the stream is back
+        events.onopen = () => loadJobs();
 
         return () => {
-            supabase.removeChannel(channel);
+            events.close();
         };
     }, []);
 
@@ -74,7 +73,10 @@ export default function QueuePage() {
                             jobs.map(job => (
                                 <tr key={job.id} className="hover:bg-[var(--color-bg-hover)] transition-colors">
                                     <td className="px-6 py-4 mono text-sm">{job.id.slice(0, 8)}...</td>
-                                    <td className="px-6 py-4 text-sm">{job.current_step}</td>
+                                    <td className="px-6 py-4 text-sm">
+                                        {job.current_step}
+                                        {job.current_step === "uploading" && job.upload_progress != null ? ` ${job.upload_progress}%` : ""}
+                                    </td>
                                     <td className="px-6 py-4 text-sm">
                                         <span className={`badge px-2 py-1 rounded text-xs ${job.status === 'completed' ? 'text-[var(--color-primary)] bg-[var(--color-primary-dim)]' :
                                                 job.status === 'error' || job.status === 'failed' ? 'text-[var(--color-danger)] bg-red-500/10' :
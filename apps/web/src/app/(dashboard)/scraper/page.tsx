@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { fetchApi } from "@/lib/api";
+import { API_URL, fetchApi } from "@/lib/api";
 
 export default function ScraperPage() {
     const [accounts, setAccounts] = useState<{ username: string }[]>([]);
@@ -19,14 +19,24 @@ export default function ScraperPage() {
             const accs = await fetchApi("/settings/instagram");
             setAccounts(accs || []);
             const jobHistory = await fetchApi("/jobs");
-            setJobs(jobHistory || []);
+            setJobs(jobHistory?.jobs || []);
         } catch (e) { console.error(e); }
     };
 
     useEffect(() => {
         refreshData();
-        const interval = setInterval(refreshData, 5000); // Polling for job status
-        return () => clearInterval(interval);
+        // Job status changes are pushed by the API instead of polled
+        const events = new EventSource(`${API_URL}/events/stream?tables=scrape_jobs`);
+        events.addEventListener("scrape_jobs", (message) => {
+            const event = JSON.parse((message as MessageEvent).data);
+            setJobs((current) => {
+                if (!current.some((job) => job.id === event.id)) {
+                    return [{ created_at: event.at, ...event }, ...current];
+                }
+                return current.map((job) => (job.id === event.id ? { ...job, ...event } : job));
+            });
+        });
+        return () => events.close();
     }, []);
 
     const handleScrape = async () => {
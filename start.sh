@@ -3,8 +3,9 @@ echo "Starting Celery Worker and FastAPI Server..."
 
 cd apps/api
 
-# Start Celery in the background
-celery -A celery_app worker --concurrency=1 --loglevel=info &
+# Start Celery in the background: one worker for network-bound stages, one for ffmpeg
+PROMETHEUS_MULTIPROC_DIR=/tmp/reelflow-metrics/io METRICS_WORKER_PORT=9101 celery -A celery_app worker -Q celery,download,metadata,publish --concurrency=4 --loglevel=info -n io@%h &
+PROMETHEUS_MULTIPROC_DIR=/tmp/reelflow-metrics/transcode METRICS_WORKER_PORT=9102 celery -A celery_app worker -Q transcode --concurrency=1 --loglevel=info -n transcode@%h &
 
 # Start Uvicorn in the foreground
 uvicorn main:app --host 0.0.0.0 --port $PORT
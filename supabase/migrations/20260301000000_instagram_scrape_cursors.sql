@@ -0,0 +1,5 @@
+-- Per-account high-water mark for incremental scraping
+ALTER TABLE public.instagram_accounts
+  ADD COLUMN IF NOT EXISTS instagram_profile_id BIGINT,
+  ADD COLUMN IF NOT EXISTS last_seen_shortcode  TEXT,
+  ADD COLUMN IF NOT EXISTS last_seen_post_at    TIMESTAMPTZ;
@@ -0,0 +1,52 @@
+-- Per-status video counters, maintained by trigger so dashboard stats never scan `videos`
+CREATE TABLE IF NOT EXISTS public.video_status_counts (
+  status  TEXT PRIMARY KEY,
+  count   BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION public.bump_video_status_count(p_status TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO public.video_status_counts (status, count)
+  VALUES (p_status, p_delta)
+  ON CONFLICT (status) DO UPDATE SET count = public.video_status_counts.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.track_video_status_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM public.bump_video_status_count(NEW.status, 1);
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM public.bump_video_status_count(OLD.status, -1);
+  ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+    PERFORM public.bump_video_status_count(OLD.status, -1);
+    PERFORM public.bump_video_status_count(NEW.status, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS videos_status_counts ON public.videos;
+CREATE TRIGGER videos_status_counts
+AFTER INSERT OR DELETE OR UPDATE OF status ON public.videos
+FOR EACH ROW EXECUTE FUNCTION public.track_video_status_counts();
+
+-- Backfill from the existing rows
+LOCK TABLE public.videos IN SHARE MODE;
+TRUNCATE public.video_status_counts;
+INSERT INTO public.video_status_counts (status, count)
+SELECT status, COUNT(*) FROM public.videos GROUP BY status;
+
+-- All dashboard counters in one round-trip (channel/account tables hold at most 5 rows each)
+CREATE OR REPLACE FUNCTION public.get_dashboard_stats()
+RETURNS JSON AS $$
+  SELECT json_build_object(
+    'total',              COALESCE((SELECT SUM(count) FROM public.video_status_counts), 0),
+    'pipeline',           COALESCE((SELECT SUM(count) FROM public.video_status_counts WHERE status IN ('processing', 'ready', 'retrying')), 0),
+    'published',          COALESCE((SELECT SUM(count) FROM public.video_status_counts WHERE status = 'published'), 0),
+    'youtube_channels',   (SELECT COUNT(*) FROM public.youtube_channels),
+    'instagram_accounts', (SELECT COUNT(*) FROM public.instagram_accounts)
+  );
+$$ LANGUAGE sql STABLE;
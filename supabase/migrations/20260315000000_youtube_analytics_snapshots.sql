@@ -0,0 +1,21 @@
+-- Time series of channel analytics, written by the periodic collector task
+CREATE TABLE IF NOT EXISTS public.youtube_analytics_snapshots (
+  id                UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  channel_id        UUID NOT NULL REFERENCES public.youtube_channels(id) ON DELETE CASCADE,
+  channel_name      TEXT,
+  thumbnail         TEXT,
+  subscriber_count  BIGINT DEFAULT 0,
+  view_count        BIGINT DEFAULT 0,
+  video_count       BIGINT DEFAULT 0,
+  recent_videos     JSONB DEFAULT '[]'::jsonb,
+  captured_at       TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS youtube_analytics_snapshots_channel_captured_idx
+  ON public.youtube_analytics_snapshots (channel_id, captured_at DESC);
+
+-- Newest snapshot per channel, what the dashboard reads
+CREATE OR REPLACE VIEW public.youtube_analytics_latest AS
+SELECT DISTINCT ON (channel_id) *
+FROM public.youtube_analytics_snapshots
+ORDER BY channel_id, captured_at DESC;
@@ -0,0 +1,6 @@
+-- Resumable YouTube upload state, so a retried publish continues from the last acknowledged chunk
+ALTER TABLE public.pipeline_jobs
+  ADD COLUMN IF NOT EXISTS upload_session_uri  TEXT,
+  ADD COLUMN IF NOT EXISTS upload_offset       BIGINT DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS upload_total_bytes  BIGINT,
+  ADD COLUMN IF NOT EXISTS upload_progress     INTEGER DEFAULT 0;
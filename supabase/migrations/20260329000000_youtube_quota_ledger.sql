@@ -0,0 +1,37 @@
+-- Units spent per channel per YouTube quota day (quota resets at midnight Pacific time)
+CREATE TABLE IF NOT EXISTS public.youtube_quota_ledger (
+  channel_id  UUID NOT NULL REFERENCES public.youtube_channels(id) ON DELETE CASCADE,
+  quota_day   DATE NOT NULL,
+  units_used  INTEGER NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (channel_id, quota_day)
+);
+
+-- Unconditionally record units (list calls, or marking a channel exhausted)
+CREATE OR REPLACE FUNCTION public.spend_youtube_quota(p_channel_id UUID, p_quota_day DATE, p_units INTEGER)
+RETURNS INTEGER AS $$
+  INSERT INTO public.youtube_quota_ledger (channel_id, quota_day, units_used)
+  VALUES (p_channel_id, p_quota_day, p_units)
+  ON CONFLICT (channel_id, quota_day) DO UPDATE
+    SET units_used = public.youtube_quota_ledger.units_used + EXCLUDED.units_used, updated_at = NOW()
+  RETURNING units_used;
+$$ LANGUAGE sql;
+
+-- Atomically reserve units only if they fit under the daily limit
+CREATE OR REPLACE FUNCTION public.reserve_youtube_quota(p_channel_id UUID, p_quota_day DATE, p_units INTEGER, p_limit INTEGER)
+RETURNS BOOLEAN AS $$
+BEGIN
+  INSERT INTO public.youtube_quota_ledger (channel_id, quota_day, units_used)
+  VALUES (p_channel_id, p_quota_day, 0)
+  ON CONFLICT (channel_id, quota_day) DO NOTHING;
+
+  UPDATE public.youtube_quota_ledger
+     SET units_used = units_used + p_units, updated_at = NOW()
+   WHERE channel_id = p_channel_id AND quota_day = p_quota_day AND units_used + p_units <= p_limit;
+  RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The channel a resumable upload session belongs to, so a retry resumes on the same channel
+ALTER TABLE public.pipeline_jobs
+  ADD COLUMN IF NOT EXISTS upload_channel_id UUID REFERENCES public.youtube_channels(id) ON DELETE SET NULL;
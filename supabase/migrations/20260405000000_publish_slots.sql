@@ -0,0 +1,6 @@
+-- Publish slot assigned by the window scheduler (status 'scheduled' until its delayed task claims it)
+ALTER TABLE public.videos
+  ADD COLUMN IF NOT EXISTS scheduled_publish_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS videos_scheduled_publish_at_idx
+  ON public.videos (scheduled_publish_at) WHERE status = 'scheduled';
@@ -0,0 +1,10 @@
+-- Index of the intro videos in the `hooks` storage bucket, maintained on upload/delete
+CREATE TABLE IF NOT EXISTS public.hook_catalog (
+  name        TEXT PRIMARY KEY,
+  url         TEXT NOT NULL,
+  size_bytes  BIGINT,
+  duration    DOUBLE PRECISION,
+  width       INTEGER,
+  height      INTEGER,
+  updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
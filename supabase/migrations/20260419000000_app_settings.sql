@@ -0,0 +1,17 @@
+-- User settings (hook mode, publish window, encode profile) when SETTINGS_BACKEND=database
+CREATE TABLE IF NOT EXISTS public.app_settings (
+  id          INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  data        JSONB NOT NULL DEFAULT '{}'::jsonb,
+  version     BIGINT NOT NULL DEFAULT 1,
+  updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Replace the settings and bump the version readers validate their cache against
+CREATE OR REPLACE FUNCTION public.save_app_settings(p_data JSONB)
+RETURNS BIGINT AS $$
+  INSERT INTO public.app_settings (id, data, version)
+  VALUES (1, p_data, 1)
+  ON CONFLICT (id) DO UPDATE
+    SET data = EXCLUDED.data, version = public.app_settings.version + 1, updated_at = NOW()
+  RETURNING version;
+$$ LANGUAGE sql;
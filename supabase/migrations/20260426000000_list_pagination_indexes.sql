@@ -0,0 +1,16 @@
+-- Keyset pagination on (created_at, id), newest first, for the list endpoints
+CREATE INDEX IF NOT EXISTS videos_status_created_idx
+  ON public.videos (status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS videos_created_idx
+  ON public.videos (created_at DESC, id DESC);
+
+-- Also serves "latest pipeline job of a video" in the Celery pipeline
+CREATE INDEX IF NOT EXISTS pipeline_jobs_video_created_idx
+  ON public.pipeline_jobs (video_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS pipeline_jobs_created_idx
+  ON public.pipeline_jobs (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS scrape_jobs_created_idx
+  ON public.scrape_jobs (created_at DESC, id DESC);
@@ -0,0 +1,4 @@
+-- ffprobe result of the downloaded clip: duration, width, height, fps, codecs, gop_seconds,
+-- bitrate_kbps, size_bytes. Written once by the download stage, read by later stages.
+ALTER TABLE public.videos
+  ADD COLUMN IF NOT EXISTS media_info JSONB;
@@ -0,0 +1,12 @@
+-- Count the publishing statuses (publish slots, quota deferrals) as in the pipeline
+CREATE OR REPLACE FUNCTION public.get_dashboard_stats()
+RETURNS JSON AS $$
+  SELECT json_build_object(
+    'total',              COALESCE((SELECT SUM(count) FROM public.video_status_counts), 0),
+    'pipeline',           COALESCE((SELECT SUM(count) FROM public.video_status_counts
+                                     WHERE status IN ('processing', 'ready', 'retrying', 'scheduled', 'publishing', 'deferred_quota')), 0),
+    'published',          COALESCE((SELECT SUM(count) FROM public.video_status_counts WHERE status = 'published'), 0),
+    'youtube_channels',   (SELECT COUNT(*) FROM public.youtube_channels),
+    'instagram_accounts', (SELECT COUNT(*) FROM public.instagram_accounts)
+  );
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,14 @@
+-- Retention for the analytics time series: drop snapshots older than p_keep_days, but never the
+-- newest one of a channel, so youtube_analytics_latest keeps a row even if collection stalls
+CREATE OR REPLACE FUNCTION public.prune_youtube_analytics_snapshots(p_keep_days INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+  deleted INTEGER;
+BEGIN
+  DELETE FROM public.youtube_analytics_snapshots s
+   WHERE s.captured_at < NOW() - make_interval(days => p_keep_days)
+     AND s.id NOT IN (SELECT id FROM public.youtube_analytics_latest);
+  GET DIAGNOSTICS deleted = ROW_COUNT;
+  RETURN deleted;
+END;
+$$ LANGUAGE plpgsql;